@@ -2,11 +2,16 @@ from socket import *
 import socket
 import threading
 import logging
+import time
 from datetime import datetime
 import sys
+import os
 
-# konfigurasi logging untuk menampilkan informasi koneksi
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# modul pengaturan socket dipakai bersama dengan server di tugas4
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tugas4'))
+from socket_tuning import prepare_listener
+import log_pipeline
+from log_pipeline import events, log_access
 
 class ProcessTheClient(threading.Thread):
     def __init__(self, connection, address):
@@ -23,8 +28,8 @@ class ProcessTheClient(threading.Thread):
                 if data:
                     # Decode byte string ke UTF-8 dan hapus spasi/karakter newline
                     # Karakter 13 (CR) dan 10 (LF) akan dihapus oleh strip()
+                    started = time.perf_counter()
                     request = data.decode('utf-8').strip()
-                    logging.info(f"Menerima request '{request}' dari {self.address}")
 
                     # proses request "TIME"
                     if request == "TIME":
@@ -37,11 +42,11 @@ class ProcessTheClient(threading.Thread):
                         
                         # Kirim response setelah di-encode kembali ke byte
                         self.connection.sendall(response_str.encode('utf-8'))
-                        logging.info(f"Mengirim response '{response_str.strip()}' ke {self.address}")
+                        log_access('time', request, '-', 'OK', len(response_str), time.perf_counter() - started)
                     
                     # proses request "QUIT"
                     elif request == "QUIT":
-                        logging.info(f"Klien {self.address} meminta untuk keluar. Koneksi ditutup.")
+                        events.info("Klien %s meminta untuk keluar. Koneksi ditutup.", self.address)
                         break # Keluar dari loop untuk menutup koneksi
                     
                     else:
@@ -52,7 +57,7 @@ class ProcessTheClient(threading.Thread):
 
                 else:
                     # recv() mengembalikan data kosong, klien telah menutup koneksi
-                    logging.info(f"Koneksi ditutup oleh {self.address} (data kosong).")
+                    events.info("Koneksi ditutup oleh %s (data kosong).", self.address)
                     break
             except Exception as e:
                 logging.error(f"Terjadi error pada koneksi dengan {self.address}: {e}")
@@ -70,15 +75,15 @@ class Server(threading.Thread):
 
     def run(self):
         # Bind socket ke semua interface ('0.0.0.0') pada port yang ditentukan
-        self.my_socket.bind(('0.0.0.0', self.port))
-        self.my_socket.listen(5) # Mengizinkan hingga 5 koneksi dalam antrian
+        # backlog dan opsi TCP mengikuti profil SOCKET_PROFILE (lihat socket_tuning.py)
+        prepare_listener(self.my_socket, ('0.0.0.0', self.port))
         logging.info(f"Server berjalan dan mendengarkan di port {self.port}")
         
         while True:
             try:
                 # Menerima koneksi baru
                 self.connection, self.client_address = self.my_socket.accept()
-                logging.info(f"Koneksi baru dari {self.client_address}")
+                events.info("Koneksi baru dari %s", self.client_address)
                 
                 # Membuat thread baru untuk menangani klien yang baru terhubung
                 clt = ProcessTheClient(self.connection, self.client_address)
@@ -89,6 +94,9 @@ class Server(threading.Thread):
                 break
 
 def main():
+    # konfigurasi logging: access log per request lewat ACCESS_LOG, kejadian
+    # koneksi di-sampling (lihat tugas4/log_pipeline.py)
+    log_pipeline.setup(level=logging.INFO)
     # server pada port 45000 sesuai ketentuan
     svr = Server(45000)
     svr.start()
@@ -0,0 +1,98 @@
+import os
+import json
+import stat
+import fnmatch
+import phase_timing
+
+#LIST rekursif untuk pohon direktori besar. Direktori dibaca dengan
+#os.scandir satu per satu (generator), sehingga entri pertama bisa dikirim
+#sebelum seluruh pohon selesai dibaca. Urutan keluaran deterministik:
+#pre-order, nama diurutkan per direktori. Urutan ini sama dengan urutan
+#leksikografis tuple komponen path, sehingga path entri terakhir yang
+#diterima client cukup dipakai sebagai cursor untuk melanjutkan.
+
+#file sementara upload yang belum selesai tidak ikut didaftar
+HIDDEN_PREFIX = '.upload-'
+
+
+def entry_type(mode):
+    if stat.S_ISDIR(mode):
+        return 'dir'
+    if stat.S_ISREG(mode):
+        return 'file'
+    if stat.S_ISLNK(mode):
+        return 'symlink'
+    return 'other'
+
+
+def split_path(path):
+    return tuple(part for part in path.split('/') if part)
+
+
+def walk(root, pattern=None, depth=None, cursor=None):
+    """
+    Menghasilkan dict per entri di bawah root: path (relatif terhadap root,
+    dipisah '/'), type, size, mtime. pattern: glob yang dicocokkan dengan
+    nama entri, atau dengan path relatif jika pattern mengandung '/'.
+    depth: jumlah tingkat maksimum (1 = isi root saja). cursor: path entri
+    terakhir dari keluaran sebelumnya; hanya entri sesudahnya yang dihasilkan.
+    Symlink ke direktori tidak diikuti.
+    """
+    after = split_path(cursor) if cursor else ()
+    match_path = pattern is not None and '/' in pattern
+    stack = [((), iter(scan(root)))]
+    while stack:
+        prefix, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        parts = prefix + (entry.name,)
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError as e:
+            # entri yang hilang/tidak bisa dibaca di tengah jalan dilaporkan, walk lanjut
+            if parts > after:
+                yield {'path': '/'.join(parts), 'error': e.strerror}
+            continue
+        is_dir = stat.S_ISDIR(st.st_mode)
+        if parts > after:
+            path = '/'.join(parts)
+            if pattern is None or fnmatch.fnmatchcase(path if match_path else entry.name, pattern):
+                yield {'path': path, 'type': entry_type(st.st_mode),
+                       'size': st.st_size, 'mtime': st.st_mtime}
+        elif not (is_dir and after[:len(parts)] == parts):
+            # seluruh subpohon ini sudah dikirim sebelum cursor
+            continue
+        if is_dir and (depth is None or len(parts) < depth):
+            try:
+                stack.append((parts, iter(scan(entry.path))))
+            except OSError as e:
+                yield {'path': '/'.join(parts), 'error': e.strerror}
+
+
+def scan(path):
+    # nama harus diurutkan agar cursor stabil; hanya DirEntry satu direktori
+    # yang ditahan di memori, bukan seluruh pohon
+    with os.scandir(path) as it:
+        entries = [entry for entry in it if not entry.name.startswith(HIDDEN_PREFIX)]
+    phase_timing.lap('disk')
+    entries.sort(key=lambda entry: entry.name)
+    return entries
+
+
+def ndjson(root, pattern=None, depth=None, cursor=None, limit=None):
+    """
+    Satu baris JSON per entri, diakhiri baris ringkasan. Jika limit tercapai
+    baris ringkasan membawa cursor untuk request berikutnya.
+    """
+    count = 0
+    last = cursor
+    for item in walk(root, pattern, depth, cursor):
+        if limit is not None and count >= limit:
+            yield (json.dumps({'done': False, 'count': count, 'cursor': last}) + '\n').encode()
+            return
+        yield (json.dumps(item) + '\n').encode()
+        count += 1
+        last = item['path']
+    yield (json.dumps({'done': True, 'count': count}) + '\n').encode()
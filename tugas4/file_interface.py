@@ -2,6 +2,7 @@ import os
 import json
 import base64
 from glob import glob
+import phase_timing
 
 class FileInterface:
     def __init__(self):
@@ -10,6 +11,7 @@ class FileInterface:
     def list(self, params=[]):
         try:
             filelist = glob('*.*')
+            phase_timing.lap('disk')
             return dict(status='OK', data=filelist)
         except Exception as e:
             return dict(status='ERROR', data=str(e))
@@ -20,7 +22,10 @@ class FileInterface:
             if filename == '':
                 return None
             with open(f"{filename}", 'rb') as fp:
-                isifile = base64.b64encode(fp.read()).decode()
+                isi = fp.read()
+            phase_timing.lap('disk')
+            isifile = base64.b64encode(isi).decode()
+            phase_timing.lap('base64')
             return dict(status='OK', data_namafile=filename, data_file=isifile)
         except Exception as e:
             return dict(status='ERROR', data=str(e))
@@ -29,12 +34,14 @@ class FileInterface:
         try:
             filename = params[0]
             file_content = base64.b64decode(params[1])
+            phase_timing.lap('base64')
             
             if os.path.exists(filename):
                 return dict(status='ERROR', data='File sudah ada')
             
             with open(filename, 'wb') as f:
                 f.write(file_content)
+            phase_timing.lap('disk')
             
             # Return success dengan informasi file
             file_size = len(file_content)
@@ -48,6 +55,7 @@ class FileInterface:
             filename = params[0]
             if os.path.exists(filename):
                 os.remove(filename)
+                phase_timing.lap('disk')
                 return dict(status='OK', data=f'File {filename} berhasil dihapus')
             return dict(status='ERROR', data='File tidak ditemukan')
         except Exception as e:
@@ -2,21 +2,43 @@ import json
 import logging
 import base64
 from file_interface import FileInterface
+import phase_timing
+from log_pipeline import events
 
 class FileProtocol:
     def __init__(self):
         self.file = FileInterface()
     
+    def encode(self, hasil):
+        # json.dumps response (bisa besar untuk GET) dicatat sebagai fase sendiri
+        data = json.dumps(hasil)
+        phase_timing.lap('json')
+        return data
+
+    @staticmethod
+    def describe(string_datamasuk):
+        """(perintah, parameter pertama) untuk access log, tanpa mem-parse JSON upload."""
+        if string_datamasuk.startswith('{'):
+            return 'JSON', '-'
+        bagian = string_datamasuk[:256].split(' ', 2)
+        return bagian[0].upper(), bagian[1] if len(bagian) > 1 else '-'
+
+    @staticmethod
+    def status_of(hasil):
+        return 'OK' if hasil.startswith('{"status": "OK"') else 'ERROR'
+
     def proses_string(self, string_datamasuk):
-        # Batasi log untuk data besar
-        preview = string_datamasuk[:50] + "..." if len(string_datamasuk) > 50 else string_datamasuk
-        logging.warning(f"Processing command: {preview}")
+        # dicatat lewat logger events (di-sampling); preview hanya dibuat jika memang dicatat
+        if events.isEnabledFor(logging.INFO):
+            preview = string_datamasuk[:50] + "..." if len(string_datamasuk) > 50 else string_datamasuk
+            events.info("Processing command: %s", preview)
         
         try:
             # Try to parse as JSON first (for UPLOAD command)
             try:
                 command_data = json.loads(string_datamasuk)
                 if isinstance(command_data, dict) and "command" in command_data:
+                    phase_timing.lap('parse')
                     return self.handle_json_command(command_data)
             except json.JSONDecodeError:
                 pass
@@ -25,17 +47,19 @@ class FileProtocol:
             parts = string_datamasuk.strip().split(' ', 1)
             command = parts[0].strip().lower()
             params = parts[1] if len(parts) > 1 else ""
+            phase_timing.label(command)
+            phase_timing.lap('parse')
             
             if command == "list":
-                return json.dumps(self.file.list([]))
+                return self.encode(self.file.list([]))
             elif command == "get":
                 if not params:
                     return json.dumps({"status": "ERROR", "data": "Nama file diperlukan"})
-                return json.dumps(self.file.get([params.strip()]))
+                return self.encode(self.file.get([params.strip()]))
             elif command == "delete":
                 if not params:
                     return json.dumps({"status": "ERROR", "data": "Nama file diperlukan"})
-                return json.dumps(self.file.delete([params.strip()]))
+                return self.encode(self.file.delete([params.strip()]))
             elif command == "upload":
                 # Handle old-style upload (fallback)
                 return json.dumps({"status": "ERROR", "data": "Format upload tidak valid. Gunakan JSON format."})
@@ -50,6 +74,7 @@ class FileProtocol:
         """Handle JSON-formatted commands"""
         try:
             command = command_data.get("command", "").lower()
+            phase_timing.label(command)
             
             if command == "upload":
                 filename = command_data.get("filename", "")
@@ -62,11 +87,12 @@ class FileProtocol:
                 try:
                     # Test decode to validate base64
                     decoded_data = base64.b64decode(filedata)
-                    logging.warning(f"Upload file: {filename}, size: {len(decoded_data)} bytes")
+                    phase_timing.lap('base64')
+                    events.info("Upload file: %s, size: %d bytes", filename, len(decoded_data))
                 except Exception as e:
                     return json.dumps({"status": "ERROR", "data": f"Data base64 tidak valid: {str(e)}"})
                 
-                return json.dumps(self.file.upload([filename, filedata]))
+                return self.encode(self.file.upload([filename, filedata]))
             else:
                 return json.dumps({"status": "ERROR", "data": "Command JSON tidak valid"})
                 
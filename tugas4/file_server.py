@@ -7,6 +7,9 @@ import sys
 
 
 from file_protocol import  FileProtocol
+from socket_tuning import prepare_listener
+import log_pipeline
+from log_pipeline import events
 fp = FileProtocol()
 
 
@@ -34,16 +37,14 @@ class Server(threading.Thread):
         self.ipinfo=(ipaddress,port)
         self.the_clients = []
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         threading.Thread.__init__(self)
 
     def run(self):
         logging.warning(f"server berjalan di ip address {self.ipinfo}")
-        self.my_socket.bind(self.ipinfo)
-        self.my_socket.listen(1)
+        prepare_listener(self.my_socket, self.ipinfo)
         while True:
             self.connection, self.client_address = self.my_socket.accept()
-            logging.warning(f"connection from {self.client_address}")
+            events.info("connection from %s", self.client_address)
 
             clt = ProcessTheClient(self.connection, self.client_address)
             clt.start()
@@ -51,6 +52,7 @@ class Server(threading.Thread):
 
 
 def main():
+    log_pipeline.setup()
     svr = Server(ipaddress='0.0.0.0',port=6666)
     svr.start()
 
@@ -5,6 +5,14 @@ import json
 import time
 from concurrent.futures import ProcessPoolExecutor
 from file_protocol import FileProtocol
+from socket_tuning import prepare_listener
+from timer_wheel import recv_request
+import phase_timing
+import log_pipeline
+from log_pipeline import events, log_access
+
+# seconds a client may stay silent before sending its request
+REQUEST_TIMEOUT = 30
 
 def handle_client_process(connection_data, address):
     """Handle client in separate process"""
@@ -38,8 +46,8 @@ def handle_client_process(connection_data, address):
         
         if all_data:
             try:
+                started = time.perf_counter()
                 message = all_data.decode('utf-8').strip()
-                logging.info(f"Processing request from {address}, length: {len(message)}")
                 
                 # Process the message
                 result = fp.proses_string(message)
@@ -49,7 +57,8 @@ def handle_client_process(connection_data, address):
                 connection.settimeout(None)
                 connection.sendall(response.encode('utf-8'))
                 
-                logging.info(f"Successfully processed request from {address}")
+                command, target = fp.describe(message)
+                log_access('file', command, target, fp.status_of(result), len(response), time.perf_counter() - started)
                 return {'status': 'success'}
                 
             except Exception as e:
@@ -78,7 +87,6 @@ class FileServerMultiprocessPool:
         self.ipinfo = (ipaddress, port)
         self.max_workers = max_workers
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.processed_requests = multiprocessing.Value('i', 0)
         self.failed_requests = multiprocessing.Value('i', 0)
         
@@ -93,8 +101,7 @@ class FileServerMultiprocessPool:
     def run(self):
         """Start the server"""
         logging.info(f"Starting multiprocess pool server at {self.ipinfo} with {self.max_workers} workers")
-        self.my_socket.bind(self.ipinfo)
-        self.my_socket.listen(100)
+        prepare_listener(self.my_socket, self.ipinfo)
         
         # Use a simpler approach - handle connections in main process
         # and only delegate processing to worker processes
@@ -102,7 +109,7 @@ class FileServerMultiprocessPool:
             while True:
                 try:
                     connection, client_address = self.my_socket.accept()
-                    logging.debug(f"New connection from {client_address}")
+                    events.debug("New connection from %s", client_address)
                     
                     # Handle client directly in main process for multiprocessing
                     self.handle_client_direct(connection, client_address)
@@ -118,47 +125,33 @@ class FileServerMultiprocessPool:
     
     def handle_client_direct(self, connection, address):
         """Handle client connection directly (simplified for multiprocessing)"""
+        phase_timing.start('file')
         try:
-            # Receive data
-            all_data = b""
-            connection.settimeout(30.0)
-            
-            while True:
-                try:
-                    chunk = connection.recv(8192)
-                    if chunk:
-                        all_data += chunk
-                        connection.settimeout(1.0)
-                    else:
-                        break
-                except socket.timeout:
-                    if all_data:
-                        break
-                    else:
-                        continue
-                except Exception as e:
-                    logging.error(f"Error receiving data from {address}: {str(e)}")
-                    break
-            
+            # Receive data, bounded by the shared header/body deadlines
+            all_data = recv_request(connection, address, REQUEST_TIMEOUT)
+            phase_timing.lap('receive')
             if all_data:
                 try:
                     # Create new FileProtocol instance
                     fp = FileProtocol()
+                    started = time.perf_counter()
                     message = all_data.decode('utf-8').strip()
-                    logging.info(f"Processing request from {address}, length: {len(message)}")
                     
                     # Process the message
                     result = fp.proses_string(message)
-                    response = result + "\r\n\r\n"
+                    response = (result + "\r\n\r\n").encode('utf-8')
+                    phase_timing.lap('encode')
                     
                     # Send response
                     connection.settimeout(None)
-                    connection.sendall(response.encode('utf-8'))
+                    connection.sendall(response)
+                    phase_timing.lap('send')
                     
                     with self.processed_requests.get_lock():
                         self.processed_requests.value += 1
                     
-                    logging.info(f"Successfully processed request from {address}")
+                    command, target = fp.describe(message)
+                    log_access('file', command, target, fp.status_of(result), len(response), time.perf_counter() - started)
                     
                 except Exception as e:
                     logging.error(f"Error processing request from {address}: {str(e)}")
@@ -180,6 +173,7 @@ class FileServerMultiprocessPool:
             with self.failed_requests.get_lock():
                 self.failed_requests.value += 1
         finally:
+            phase_timing.finish()
             try:
                 connection.close()
             except:
@@ -197,10 +191,7 @@ def main():
     if len(sys.argv) > 2:
         port = int(sys.argv[2])
     
-    logging.basicConfig(
-        level=logging.INFO, 
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
+    log_pipeline.setup(level=logging.INFO)
     
     server = FileServerMultiprocessPool(max_workers=max_workers, port=port)
     server.run()
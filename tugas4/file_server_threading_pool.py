@@ -2,62 +2,61 @@ import socket
 import threading
 import logging
 import json
+import time
 from concurrent.futures import ThreadPoolExecutor
 from file_protocol import FileProtocol
+from socket_tuning import prepare_listener
+from timer_wheel import recv_request
+import phase_timing
+import log_pipeline
+from log_pipeline import events, log_access
+from work_queue import BoundedExecutor, reject, RETRY_AFTER
+
+# seconds a client may stay silent before sending its request
+REQUEST_TIMEOUT = 30
 
 class FileServerThreadingPool:
-    def __init__(self, ipaddress='0.0.0.0', port=7777, max_workers=5):
+    def __init__(self, ipaddress='0.0.0.0', port=7777, max_workers=5, max_queue=100):
         self.ipinfo = (ipaddress, port)
         self.max_workers = max_workers
+        self.max_queue = max_queue
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.fp = FileProtocol()
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # koneksi di luar max_workers + max_queue langsung ditolak
+        self.executor = BoundedExecutor(ThreadPoolExecutor(max_workers=max_workers), max_workers, max_queue)
+        self.busy = (json.dumps(dict(status='ERROR', data='Server sibuk, coba lagi',
+                                     retry_after=RETRY_AFTER)) + "\r\n\r\n").encode('utf-8')
         self.processed_requests = 0
         self.failed_requests = 0
         self.lock = threading.Lock()
         
-    def handle_client(self, connection, address):
+    def handle_client(self, connection, address, trace=None):
         """Handle individual client connection"""
+        phase_timing.attach(trace)
         try:
-            # Receive data
-            all_data = b""
-            connection.settimeout(30.0)  # 30 second timeout
-            
-            while True:
-                try:
-                    chunk = connection.recv(8192)
-                    if chunk:
-                        all_data += chunk
-                        connection.settimeout(1.0)  # Reduce timeout after first chunk
-                    else:
-                        break
-                except socket.timeout:
-                    if all_data:
-                        break
-                    else:
-                        continue
-                except Exception as e:
-                    logging.error(f"Error receiving data from {address}: {str(e)}")
-                    break
-            
+            # Receive data, bounded by the shared header/body deadlines
+            all_data = recv_request(connection, address, REQUEST_TIMEOUT)
+            phase_timing.lap('receive')
             if all_data:
                 try:
+                    started = time.perf_counter()
                     message = all_data.decode('utf-8').strip()
-                    logging.info(f"Processing request from {address}, length: {len(message)}")
                     
                     # Process the message
                     result = self.fp.proses_string(message)
-                    response = result + "\r\n\r\n"
+                    response = (result + "\r\n\r\n").encode('utf-8')
+                    phase_timing.lap('encode')
                     
                     # Send response
                     connection.settimeout(None)
-                    connection.sendall(response.encode('utf-8'))
+                    connection.sendall(response)
+                    phase_timing.lap('send')
                     
                     with self.lock:
                         self.processed_requests += 1
                     
-                    logging.info(f"Successfully processed request from {address}")
+                    command, target = self.fp.describe(message)
+                    log_access('file', command, target, self.fp.status_of(result), len(response), time.perf_counter() - started)
                     
                 except Exception as e:
                     logging.error(f"Error processing request from {address}: {str(e)}")
@@ -74,6 +73,7 @@ class FileServerThreadingPool:
             with self.lock:
                 self.failed_requests += 1
         finally:
+            phase_timing.finish()
             try:
                 connection.close()
             except:
@@ -90,26 +90,32 @@ class FileServerThreadingPool:
     def get_stats(self):
         """Get server statistics"""
         with self.lock:
-            return {
+            stats = {
                 'processed': self.processed_requests,
                 'failed': self.failed_requests,
                 'total': self.processed_requests + self.failed_requests
             }
+        stats.update(self.executor.stats())
+        if phase_timing.enabled:
+            stats['phases'] = phase_timing.report()
+        return stats
     
     def run(self):
         """Start the server"""
-        logging.info(f"Starting threading pool server at {self.ipinfo} with {self.max_workers} workers")
-        self.my_socket.bind(self.ipinfo)
-        self.my_socket.listen(100)  # Large backlog for stress testing
+        logging.info(f"Starting threading pool server at {self.ipinfo} with {self.max_workers} workers, queue {self.max_queue}")
+        prepare_listener(self.my_socket, self.ipinfo)
         
         try:
             while True:
                 try:
                     connection, client_address = self.my_socket.accept()
-                    logging.debug(f"New connection from {client_address}")
+                    events.debug("New connection from %s", client_address)
                     
-                    # Submit task to thread pool
-                    self.executor.submit(self.handle_client, connection, client_address)
+                    # Submit task to thread pool, or shed load when the queue is full
+                    trace = phase_timing.begin('file')
+                    if self.executor.try_submit(self.handle_client, connection, client_address, trace) is None:
+                        reject(connection, self.busy)
+                        logging.warning(f"Server busy, rejected {client_address}: {self.executor.stats()}")
                     
                 except Exception as e:
                     logging.error(f"Error accepting connection: {str(e)}")
@@ -127,18 +133,18 @@ def main():
     # Parse command line arguments
     max_workers = 5
     port = 7777
+    max_queue = 100
     
     if len(sys.argv) > 1:
         max_workers = int(sys.argv[1])
     if len(sys.argv) > 2:
         port = int(sys.argv[2])
+    if len(sys.argv) > 3:
+        max_queue = int(sys.argv[3])
     
-    logging.basicConfig(
-        level=logging.INFO, 
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
+    log_pipeline.setup(level=logging.INFO)
     
-    server = FileServerThreadingPool(max_workers=max_workers, port=port)
+    server = FileServerThreadingPool(max_workers=max_workers, port=port, max_queue=max_queue)
     server.run()
 
 if __name__ == "__main__":
@@ -2,9 +2,354 @@ import sys
 import os
 import os.path
 import uuid
+import tempfile
+import zlib
+import ssl
 from glob import glob
-from datetime import datetime
+import time
+from urllib.parse import urlsplit, unquote, parse_qs
+from email.utils import formatdate, parsedate_to_datetime
 import json # Digunakan untuk format daftar file
+from http_cache import ResponseCache
+from open_file_cache import OpenFileCache
+from http_parser import HttpParser
+from http_metrics import Metrics
+from timer_wheel import expired_counts
+from work_queue import RETRY_AFTER
+import phase_timing
+from log_pipeline import log_access
+import dir_listing
+
+KEEPALIVE_TIMEOUT = 5
+KEEPALIVE_MAX = 100
+
+
+MAX_RANGES = 16
+
+COMPRESSIBLE_TYPES = ('text/html', 'text/plain', 'application/json', 'application/x-ndjson')
+COMPRESS_MIN_SIZE = 256
+COMPRESS_LEVEL = 6
+
+#body streaming: ukuran maksimum satu chunk, dan batas waktu menahan
+#potongan kecil sebelum dikirim
+STREAM_CHUNK = 16384
+STREAM_FLUSH = 0.05
+
+#ukuran potongan pread saat file dikirim lewat TLS (tanpa sendfile)
+SEND_BLOCK = 65536
+
+
+def accepted_encoding(value):
+    """
+    Memilih gzip atau deflate dari header Accept-Encoding berdasarkan
+    q-value (gzip diutamakan jika sama), 'identity' jika tidak ada.
+    """
+    weights = {}
+    for item in value.split(','):
+        name, sep, params = item.partition(';')
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_q = 'identity', 0.0
+    for encoding in ('gzip', 'deflate'):
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_q:
+            best, best_q = encoding, weight
+    return best
+
+
+def compress(data, encoding):
+    # gzip memakai header gzip (wbits 31), deflate memakai format zlib (wbits 15)
+    wbits = 31 if encoding == 'gzip' else 15
+    c = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+    return c.compress(data) + c.flush()
+
+
+def variant_etag(etag, encoding):
+    # tiap encoding adalah representasi berbeda, ETag-nya juga harus berbeda
+    if encoding == 'identity':
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def parse_range(value, size):
+    """
+    Mengurai header Range (bytes=a-b, a-, -n, dipisah koma) menjadi list
+    (offset, count) yang sudah diurutkan dan digabung jika tumpang tindih.
+    None berarti header diabaikan (format salah), [] berarti tidak ada
+    range yang bisa dipenuhi (416).
+    """
+    unit, sep, specs = value.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        first, sep, last = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if first == '':
+                # suffix range: n byte terakhir
+                n = int(last)
+                if n <= 0:
+                    continue
+                start, end = max(0, size - n), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last != '' else size - 1
+                if last != '' and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size:
+            ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+    ranges.sort()
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return [(start, end - start + 1) for start, end in merged]
+
+
+class FileRegion:
+    """
+    Body response berupa potongan file yang sudah dibuka. Isinya tidak
+    dibaca ke memori, front-end mengirimnya dengan socket.sendfile.
+    parts berisi (offset, count) untuk isi file atau bytes untuk teks
+    sisipan (batas multipart/byteranges).
+    """
+    def __init__(self, fp, parts=None):
+        self.fp = fp
+        if parts is None:
+            parts = [(0, os.fstat(fp.fileno()).st_size)]
+        self.parts = parts
+        self.count = sum(len(p) if isinstance(p, bytes) else p[1] for p in parts)
+
+    def __len__(self):
+        return self.count
+
+    def read(self):
+        # dipakai jika front-end tidak mendukung sendfile (mis. proses()).
+        # pread, bukan seek+read: fd dari OpenFileCache berbagi offset
+        try:
+            isi = []
+            for part in self.parts:
+                if isinstance(part, bytes):
+                    isi.append(part)
+                else:
+                    isi.append(os.pread(self.fp.fileno(), part[1], part[0]))
+            return b''.join(isi)
+        finally:
+            self.fp.close()
+
+    def sendfile(self, connection):
+        try:
+            for part in self.parts:
+                if isinstance(part, bytes):
+                    connection.sendall(part)
+                elif isinstance(connection, ssl.SSLSocket):
+                    # SSLSocket.sendfile jatuh ke seek+read pada offset bersama
+                    offset, count = part
+                    while count > 0:
+                        data = os.pread(self.fp.fileno(), min(count, SEND_BLOCK), offset)
+                        if not data:
+                            break
+                        connection.sendall(data)
+                        offset += len(data)
+                        count -= len(data)
+                else:
+                    connection.sendfile(self.fp, part[0], part[1])
+        finally:
+            self.fp.close()
+
+
+class StreamBody:
+    """
+    Body response yang dihasilkan bertahap oleh iterator bytes (mis. LIST
+    rekursif), panjangnya tidak diketahui di depan. Dikirim dengan
+    Transfer-Encoding: chunked, atau pada HTTP/1.0 diakhiri dengan menutup
+    koneksi. Potongan kecil digabung sampai STREAM_CHUNK byte atau
+    STREAM_FLUSH detik, potongan besar dipecah menjadi STREAM_CHUNK byte.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.chunked = True
+        self.compressor = None
+        self.sent = 0
+
+    def compress(self, encoding):
+        # dikompresi per chunk saat dikirim; Z_SYNC_FLUSH di setiap chunk agar
+        # client bisa langsung men-decode apa yang sudah diterima
+        wbits = 31 if encoding == 'gzip' else 15
+        self.compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+
+    def frame(self, data, final=False):
+        # satu chunk sebagai tuple buffer (ukuran, isi, CRLF) untuk vectored write
+        if self.compressor is not None:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        self.sent += len(data)
+        if self.chunked and data:
+            return (b'%x\r\n' % len(data), bytes(data), b'\r\n')
+        return (bytes(data),)
+
+    def chunks(self):
+        """Generator tuple buffer per chunk, termasuk chunk penutup."""
+        buffer = bytearray()
+        last = time.monotonic()
+        try:
+            for data in self.source:
+                buffer += data
+                while len(buffer) >= STREAM_CHUNK:
+                    yield self.frame(buffer[:STREAM_CHUNK])
+                    del buffer[:STREAM_CHUNK]
+                    last = time.monotonic()
+                if buffer and time.monotonic() - last >= STREAM_FLUSH:
+                    yield self.frame(buffer)
+                    buffer = bytearray()
+                    last = time.monotonic()
+        except Exception as e:
+            # status sudah terkirim; koneksi diputus tanpa chunk penutup
+            # sehingga client tahu body-nya terpotong
+            raise OSError("stream body gagal: {}".format(e))
+        finally:
+            self.close()
+        if buffer or self.compressor is not None:
+            yield self.frame(buffer, final=True)
+        if self.chunked:
+            yield (b'0\r\n\r\n',)
+
+    def read(self):
+        # dipakai jika front-end tidak mengirim per chunk (mis. proses())
+        return b''.join(b''.join(buffers) for buffers in self.chunks())
+
+    def close(self):
+        close = getattr(self.source, 'close', None)
+        if close is not None:
+            close()
+
+
+class UploadFile:
+    """
+    Body PUT yang ditulis bertahap ke file sementara di direktori tujuan,
+    lalu dipindahkan secara atomik dengan os.replace.
+    """
+    def __init__(self, thedir='./'):
+        fd, self.path = tempfile.mkstemp(prefix='.upload-', dir=thedir)
+        self.fp = os.fdopen(fd, 'wb')
+        self.size = 0
+
+    def write(self, data):
+        self.fp.write(data)
+        self.size += len(data)
+
+    def close(self):
+        self.fp.close()
+
+    def discard(self):
+        self.fp.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def commit(self, file_path):
+        self.fp.close()
+        os.chmod(self.path, 0o644)
+        os.replace(self.path, file_path)
+
+
+# baris header yang sama untuk semua response, di-encode sekali saja
+SERVER_LINE = b"Server: myserver/1.0\r\n"
+CONNECTION_CLOSE = b"Connection: close\r\n" + SERVER_LINE
+CONNECTION_KEEP_ALIVE = (b"Connection: keep-alive\r\n"
+                         + f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT}, max={KEEPALIVE_MAX}\r\n".encode()
+                         + SERVER_LINE)
+
+_status_lines = {}
+_date_line = (0, b"")
+
+
+def status_line(kode, message):
+    line = _status_lines.get((kode, message))
+    if line is None:
+        line = f"HTTP/1.1 {kode} {message}\r\n".encode()
+        _status_lines[(kode, message)] = line
+    return line
+
+
+def date_line():
+    # header Date format RFC 7231 (IMF-fixdate), diperbarui paling sering sekali per detik
+    global _date_line
+    sekarang = int(time.time())
+    detik, line = _date_line
+    if detik != sekarang:
+        line = f"Date: {formatdate(sekarang, usegmt=True)}\r\n".encode()
+        _date_line = (sekarang, line)
+    return line
+
+
+class HttpResponse:
+    """
+    Response yang belum dikirim: status, header, dan body berupa bytes,
+    FileRegion (sendfile) atau StreamBody (iterator buffer, chunked).
+    Header Connection baru ditentukan saat dikirim, karena bergantung pada
+    status koneksi. Front-end menulis head_parts() dan body sebagai buffer
+    terpisah (sendmsg), header dan body tidak pernah digabung.
+    """
+    def __init__(self, kode, message, body=b'', headers={}, static_head=None):
+        self.kode = kode
+        self.message = message
+        self.body = body
+        self.headers = dict(headers)
+        self.keep_alive = False
+        # bagian header yang tidak berubah antar request (dari cache)
+        self.static_head = static_head
+
+    def render_headers(self):
+        resp = []
+        if isinstance(self.body, StreamBody):
+            if self.body.chunked:
+                resp.append("Transfer-Encoding: chunked\r\n")
+        elif self.kode != 304:
+            # 304 tidak membawa body, Content-Length: 0 bisa disalahartikan cache
+            resp.append(f"Content-Length: {len(self.body)}\r\n")
+        for kk in self.headers:
+            resp.append(f"{kk}: {self.headers[kk]}\r\n")
+        resp.append("\r\n")
+        return ''.join(resp).encode()
+
+    def head_parts(self):
+        static_head = self.static_head
+        if static_head is None:
+            static_head = self.render_headers()
+        connection = CONNECTION_KEEP_ALIVE if self.keep_alive else CONNECTION_CLOSE
+        return status_line(self.kode, self.message), date_line(), connection, static_head
+
+    def head(self):
+        return b''.join(self.head_parts())
+
+    def buffers(self):
+        # header + body bytes sebagai daftar buffer untuk satu vectored write;
+        # body FileRegion/StreamBody dikirim terpisah oleh front-end
+        buffers = list(self.head_parts())
+        if isinstance(self.body, (bytes, bytearray, memoryview)) and self.body:
+            buffers.append(self.body)
+        return buffers
+
+    def to_bytes(self):
+        body = self.body
+        if isinstance(body, (FileRegion, StreamBody)):
+            body = body.read()
+        return self.head() + body
+
 
 class HttpServer:
     def __init__(self):
@@ -15,42 +360,124 @@ class HttpServer:
         self.types['.txt'] = 'text/plain'
         self.types['.html'] = 'text/html'
         self.types['.json'] = 'application/json' # Tambahkan tipe untuk JSON
+        # response file kecil yang sudah dirender, dipakai bersama dalam satu proses
+        self.cache = ResponseCache()
+        # fd, stat, mime dan ETag per path request (lihat open_file_cache.py)
+        self.files = OpenFileCache('./', self.describe)
+        self.metrics = Metrics()
 
     def response(self, kode=404, message='Not Found', messagebody=bytes(), headers={}):
-        tanggal = datetime.now().strftime('%c')
-        resp = []
-        resp.append(f"HTTP/1.0 {kode} {message}\r\n")
-        resp.append(f"Date: {tanggal}\r\n")
-        resp.append("Connection: close\r\n")
-        resp.append("Server: myserver/1.0\r\n")
-        resp.append(f"Content-Length: {len(messagebody)}\r\n")
-        for kk in headers:
-            resp.append(f"{kk}:{headers[kk]}\r\n")
-        resp.append("\r\n")
+        """
+        messagebody: str, bytes, FileRegion, StreamBody, atau iterable bytes
+        lain (generator) yang akan di-stream dengan chunked encoding.
+        """
+        if isinstance(messagebody, str):
+            messagebody = messagebody.encode()
+        elif not isinstance(messagebody, (bytes, bytearray, memoryview, FileRegion, StreamBody)):
+            messagebody = StreamBody(messagebody)
+        return HttpResponse(kode, message, messagebody, headers)
 
-        response_headers = ''.join(resp)
+    def wants_keep_alive(self, version, headers):
+        # HTTP/1.1 persistent secara default, HTTP/1.0 hanya jika diminta
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
 
-        if not isinstance(messagebody, bytes):
-            messagebody = messagebody.encode()
+    def open_upload(self):
+        # tempat body PUT besar di-stream oleh front-end
+        return UploadFile('./')
 
-        response = response_headers.encode() + messagebody
-        return response
+    def handle(self, data, keep_alive=False):
+        """
+        Memproses satu request lengkap dalam bentuk bytes dan mengembalikan
+        (response, keep_alive). Front-end yang membaca dari socket sebaiknya
+        memakai HttpParser sendiri lalu memanggil handle_request().
+        """
+        requests = HttpParser().feed(data)
+        if not requests:
+            hasil = self.response(400, 'Bad Request', 'Request tidak lengkap', {})
+            return hasil, False
+        return self.handle_request(requests[0], keep_alive)
+
+    def handle_request(self, request, keep_alive=False):
+        """
+        Memproses satu HttpRequest hasil HttpParser dan mengembalikan
+        (response, keep_alive). keep_alive adalah izin dari server (batas
+        request per koneksi), hasil akhirnya juga bergantung pada versi HTTP
+        dan header Connection. Body request berupa UploadFile jika sudah
+        di-stream ke disk oleh parser.
+        """
+        started = self.metrics.begin()
+        body = request.body
+        kode, panjang = 500, 0
+        try:
+            if request.error is not None:
+                kode, message = request.error
+                if isinstance(body, UploadFile):
+                    body.discard()
+                hasil = self.response(kode, message, '', {})
+                return hasil, False
+
+            keep_alive = keep_alive and self.wants_keep_alive(request.version, request.headers)
+            hasil = self.dispatch(request.method, request.target, request.headers, body)
+            self.compress_response(hasil, request.headers)
+            if isinstance(hasil.body, StreamBody):
+                # HTTP/1.0 tidak mengenal chunked: akhir body ditandai dengan
+                # menutup koneksi. Panjangnya belum diketahui saat ini
+                if request.version != 'HTTP/1.1':
+                    hasil.body.chunked = False
+                    keep_alive = False
+                kode, panjang = hasil.kode, 0
+            else:
+                kode, panjang = hasil.kode, len(hasil.body)
+            if isinstance(body, UploadFile):
+                # file sementara yang tidak dipakai handler (error/403) dibuang
+                body.discard()
+            if hasil.kode >= 500:
+                keep_alive = False
+            hasil.keep_alive = keep_alive
+            phase_timing.lap('handle')
+            return hasil, keep_alive
+        finally:
+            diterima = body.size if isinstance(body, UploadFile) else len(body)
+            durasi = self.metrics.end(started, request.method, kode, diterima, panjang)
+            log_access('http', request.method, request.target, kode, panjang, durasi)
+
+    def compress_response(self, hasil, headers):
+        # kompresi on-the-fly untuk response yang dibangun di memori (LIST, teks);
+        # response dari cache sudah membawa varian encoding-nya sendiri
+        if hasil.kode != 200 or hasil.static_head is not None or not isinstance(hasil.body, (bytes, StreamBody)):
+            return
+        content_type = ''
+        for kk in hasil.headers:
+            if kk.lower() == 'content-encoding':
+                return
+            if kk.lower() == 'content-type':
+                content_type = hasil.headers[kk].split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_TYPES:
+            return
+        if isinstance(hasil.body, bytes) and len(hasil.body) < COMPRESS_MIN_SIZE:
+            return
+        hasil.headers['Vary'] = 'Accept-Encoding'
+        encoding = accepted_encoding(headers.get('accept-encoding', ''))
+        if encoding != 'identity' and isinstance(hasil.body, StreamBody):
+            hasil.body.compress(encoding)
+            hasil.headers['Content-Encoding'] = encoding
+        elif encoding != 'identity':
+            phase_timing.lap('handle')
+            hasil.body = compress(hasil.body, encoding)
+            hasil.headers['Content-Encoding'] = encoding
+            phase_timing.lap('compress')
 
     def proses(self, data):
-        # Pisahkan header dan body
-        # Ini penting untuk metode seperti PUT dan POST yang membawa data di body
-        request_parts = data.split("\r\n\r\n", 1)
-        requests = request_parts[0].split("\r\n")
-        body = request_parts[1] if len(request_parts) > 1 else ""
-        
-        baris = requests[0]
-        all_headers = {h.split(": ")[0]: h.split(": ")[1] for h in requests[1:] if ': ' in h}
+        if not isinstance(data, bytes):
+            data = data.encode()
+        hasil, keep_alive = self.handle(data)
+        return hasil.to_bytes()
 
-        j = baris.split(" ")
+    def dispatch(self, method, object_address, all_headers, body):
         try:
-            method = j[0].upper().strip()
-            object_address = j[1].strip()
-
             if method == 'GET':
                 return self.http_get(object_address, all_headers)
             elif method == 'POST':
@@ -65,38 +492,192 @@ class HttpServer:
                 return self.http_delete(object_address, all_headers)
             else:
                 return self.response(400, 'Bad Request', 'Metode tidak dikenali', {})
-        except IndexError:
-            return self.response(400, 'Bad Request', '', {})
         except Exception as e:
             return self.response(500, 'Internal Server Error', str(e), {})
 
     def http_get(self, object_address, headers):
-        thedir = './'
         if object_address == '/':
             return self.response(200, 'OK', 'Ini adalah web server percobaan', {})
+        if object_address == '/metrics':
+            return self.http_metrics()
+        if object_address == '/debug/phases' and phase_timing.enabled:
+            return self.response(200, 'OK', json.dumps(phase_timing.report(), indent=1),
+                                 {'Content-type': 'application/json', 'Cache-Control': 'no-store'})
 
-        object_address = object_address.lstrip('/')
-        file_path = os.path.join(thedir, object_address)
-
-        if not os.path.exists(file_path):
-            return self.response(404, 'Not Found', '', {})
-        
-        # Jangan izinkan akses ke direktori di atasnya
-        if not os.path.abspath(file_path).startswith(os.path.abspath(thedir)):
+        # path request dipakai langsung sebagai kunci: GET yang berulang tidak
+        # menormalisasi path, tidak stat() dan tidak open() lagi selama entri valid
+        try:
+            info = self.files.lookup(object_address)
+        except PermissionError:
+            # Jangan izinkan akses ke direktori di atasnya
             return self.response(403, 'Forbidden', '', {})
+        except OSError:
+            return self.response(404, 'Not Found', '', {})
+        if info.is_dir:
+            return self.response(404, 'Not Found', '', {})
+        st = info.st
+        content_type = info.content_type
+
+        # pilih encoding: file .gz yang sudah ada di disk, kompresi on-the-fly
+        # (hanya untuk file yang masuk cache), atau identity
+        compressible = content_type in COMPRESSIBLE_TYPES
+        encoding = 'identity'
+        body = info
+        if compressible and 'range' not in headers:
+            encoding = accepted_encoding(headers.get('accept-encoding', ''))
+            gz = None
+            if encoding == 'gzip':
+                # .gz yang tidak ada juga di-cache (entri negatif)
+                try:
+                    gz = self.files.lookup(object_address + '.gz')
+                except OSError:
+                    pass
+            if gz is not None and not gz.is_dir and gz.st.st_mtime_ns >= st.st_mtime_ns:
+                body = gz
+            elif not self.cache.cacheable(st):
+                encoding = 'identity'
+
+        etag = variant_etag(body.etag, encoding)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+        validators = {'ETag': etag, 'Last-Modified': last_modified}
+        if compressible:
+            validators['Vary'] = 'Accept-Encoding'
+        if self.not_modified(headers, etag, st.st_mtime):
+            return self.response(304, 'Not Modified', '', validators)
+        if encoding != 'identity':
+            validators['Content-Encoding'] = encoding
+
+        if 'range' not in headers and self.cache.cacheable(body.st):
+            return self.cached_get(body, content_type, validators,
+                                   encoding if body is info else None)
+        size = body.st.st_size
+        if body is not info:
+            # .gz besar dikirim apa adanya dengan sendfile
+            resp_headers = {'Content-type': content_type, **validators}
+            return self.response(200, 'OK', FileRegion(self.files.open(body), [(0, size)]), resp_headers)
+
+        # isi file tidak dibaca di sini, dikirim langsung dari fd oleh front-end
+        fp = self.files.open(info)
+
+        ranges = None
+        if 'range' in headers and self.if_range(headers, etag, st.st_mtime):
+            ranges = parse_range(headers['range'], size)
+        if ranges == []:
+            fp.close()
+            return self.response(416, 'Range Not Satisfiable', '', {'Content-Range': f'bytes */{size}'})
+        if ranges is None:
+            resp_headers = {'Content-type': content_type, 'Accept-Ranges': 'bytes', **validators}
+            return self.response(200, 'OK', FileRegion(fp, [(0, size)]), resp_headers)
+
+        if len(ranges) == 1:
+            offset, count = ranges[0]
+            resp_headers = {'Content-type': content_type,
+                            'Content-Range': f'bytes {offset}-{offset + count - 1}/{size}',
+                            **validators}
+            return self.response(206, 'Partial Content', FileRegion(fp, ranges), resp_headers)
+
+        # beberapa range dikirim sebagai multipart/byteranges
+        boundary = uuid.uuid4().hex
+        parts = []
+        for offset, count in ranges:
+            parts.append((f"--{boundary}\r\n"
+                          f"Content-Type: {content_type}\r\n"
+                          f"Content-Range: bytes {offset}-{offset + count - 1}/{size}\r\n\r\n").encode())
+            parts.append((offset, count))
+            parts.append(b"\r\n")
+        parts.append(f"--{boundary}--\r\n".encode())
+        resp_headers = {'Content-type': f'multipart/byteranges; boundary={boundary}', **validators}
+        return self.response(206, 'Partial Content', FileRegion(fp, parts), resp_headers)
 
-        with open(file_path, 'rb') as fp:
-            isi = fp.read()
+    def cached_get(self, info, content_type, validators, compress_with=None):
+        # compress_with: encoding untuk kompresi on-the-fly, None jika file
+        # sudah dalam bentuk akhirnya (identity atau .gz di disk)
+        file_path, st = info.path, info.st
+        encoding = compress_with or validators.get('Content-Encoding', 'identity')
+        variant = self.cache.get(file_path, st, encoding)
+        if variant is None:
+            phase_timing.lap('handle')
+            with self.files.open(info) as fp:
+                # satu byte lebih untuk mendeteksi file yang bertambah panjang
+                isi = os.pread(fp.fileno(), st.st_size + 1, 0)
+                while len(isi) > st.st_size:
+                    sisa = os.pread(fp.fileno(), SEND_BLOCK, len(isi))
+                    if not sisa:
+                        break
+                    isi += sisa
+            phase_timing.lap('disk')
+            lengkap = len(isi) == st.st_size
+            if compress_with not in (None, 'identity'):
+                isi = compress(isi, compress_with)
+                phase_timing.lap('compress')
+            resp_headers = {'Content-type': content_type, **validators}
+            if encoding == 'identity':
+                resp_headers['Accept-Ranges'] = 'bytes'
+            hasil = self.response(200, 'OK', isi, resp_headers)
+            hasil.static_head = hasil.render_headers()
+            # file bisa berubah di antara stat() dan read(), jangan simpan hasil campuran
+            if lengkap:
+                self.cache.put(file_path, st, hasil.static_head, isi, encoding)
+            return hasil
+        head, body = variant
+        return HttpResponse(200, 'OK', body, static_head=head)
 
+    def busy(self):
+        # dibuat per penolakan (bukan sekali saat start) agar header Date tetap baru
+        return self.response(503, 'Service Unavailable', 'Server sibuk, coba lagi nanti',
+                             {'Retry-After': str(RETRY_AFTER)}).to_bytes()
+
+    def describe(self, file_path, st):
+        # dihitung sekali per entri OpenFileCache
         fext = os.path.splitext(file_path)[1]
-        content_type = self.types.get(fext, 'application/octet-stream')
+        return self.types.get(fext, 'application/octet-stream'), self.etag(st)
+
+    def etag(self, st):
+        # strong ETag dari inode, ukuran dan mtime (nanodetik)
+        return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+    def modified_since(self, value, mtime):
+        try:
+            since = parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return True
+        # Last-Modified hanya berpresisi detik
+        return int(mtime) > since
+
+    def not_modified(self, headers, etag, mtime):
+        # If-None-Match lebih diutamakan daripada If-Modified-Since
+        if 'if-none-match' in headers:
+            tags = [t.strip() for t in headers['if-none-match'].split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        if 'if-modified-since' in headers:
+            return not self.modified_since(headers['if-modified-since'], mtime)
+        return False
+
+    def if_range(self, headers, etag, mtime):
+        # Range hanya dipakai jika representasi belum berubah sejak If-Range
+        if 'if-range' not in headers:
+            return True
+        value = headers['if-range'].strip()
+        if value.startswith('"'):
+            return value == etag
+        return not self.modified_since(value, mtime)
 
-        headers = {'Content-type': content_type}
-        return self.response(200, 'OK', isi, headers)
+    def http_metrics(self):
+        extra = {}
+        for key, value in self.cache.stats().items():
+            extra['http_cache_' + key] = value
+        for key, value in self.files.stats().items():
+            extra['http_open_file_cache_' + key] = value
+        for phase, n in list(expired_counts.items()):
+            extra['http_deadline_expired_{}_total'.format(phase)] = n
+        return self.response(200, 'OK', self.metrics.render(extra),
+                             {'Content-type': 'text/plain; version=0.0.4', 'Cache-Control': 'no-store'})
 
     def http_post(self, object_address, headers, body):
         # Fungsionalitas POST bisa dikembangkan di sini
         # Contoh: memproses data dari form
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'ignore')
         return self.response(200, 'OK', f"Data POST diterima: {body}", {})
 
     # ----- METODE-METODE BARU -----
@@ -104,9 +685,15 @@ class HttpServer:
     def http_list(self, object_address, headers):
         """
         Menangani metode LIST untuk melihat daftar file dalam direktori.
+        Tanpa query string hasilnya satu objek JSON berisi isi direktori.
+        Dengan query string (atau Accept: application/x-ndjson) isi direktori
+        didaftar rekursif dan di-stream sebagai NDJSON (lihat dir_listing.py):
+
+            LIST /files?glob=*.jpg&depth=2&limit=1000&cursor=a/b.jpg HTTP/1.1
         """
         thedir = './'
-        dir_path_str = object_address.lstrip('/')
+        target = urlsplit(object_address)
+        dir_path_str = unquote(target.path).lstrip('/')
         dir_path = os.path.join(thedir, dir_path_str)
 
         # Validasi keamanan dasar
@@ -115,6 +702,9 @@ class HttpServer:
         if not os.path.abspath(dir_path).startswith(os.path.abspath(thedir)):
             return self.response(403, 'Forbidden', '', {})
 
+        if target.query or 'application/x-ndjson' in headers.get('accept', ''):
+            return self.stream_list(dir_path, parse_qs(target.query))
+
         try:
             files = os.listdir(dir_path)
             # Menggunakan JSON untuk output yang terstruktur
@@ -123,6 +713,22 @@ class HttpServer:
         except Exception as e:
             return self.response(500, 'Internal Server Error', str(e), {})
 
+    def stream_list(self, dir_path, query):
+        try:
+            depth = int(query['depth'][0]) if 'depth' in query else None
+            limit = int(query['limit'][0]) if 'limit' in query else None
+        except ValueError:
+            return self.response(400, 'Bad Request', 'depth/limit harus bilangan bulat', {})
+        # limit < 1 tidak pernah memajukan cursor: client yang mengikuti cursor
+        # akan mengulang tanpa akhir
+        if (depth is not None and depth < 1) or (limit is not None and limit < 1):
+            return self.response(400, 'Bad Request', 'depth/limit minimal 1', {})
+        pattern = query.get('glob', [None])[0]
+        cursor = query.get('cursor', [None])[0]
+        entries = dir_listing.ndjson(dir_path, pattern, depth, cursor, limit)
+        return self.response(200, 'OK', entries,
+                             {'Content-Type': 'application/x-ndjson', 'Cache-Control': 'no-store'})
+
     def http_put(self, object_address, headers, body):
         """
         Menangani metode PUT untuk mengunggah (upload) file.
@@ -133,18 +739,30 @@ class HttpServer:
 
         # Validasi keamanan dasar: jangan menimpa file di luar direktori kerja
         if not os.path.abspath(file_path).startswith(os.path.abspath(thedir)):
+            if isinstance(body, UploadFile):
+                body.discard()
             return self.response(403, 'Forbidden', '', {})
-        
-        # Pastikan direktori client ada jika targetnya di sana
-        if 'client/' in file_path_str:
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
         try:
-            # Body sudah dalam bentuk string, perlu di-encode kembali ke bytes untuk ditulis
-            with open(file_path, 'wb') as f:
-                f.write(body.encode('utf-8')) # Asumsi body adalah utf-8 string
+            # Pastikan direktori client ada jika targetnya di sana
+            if 'client/' in file_path_str:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+            # Body kecil (atau dari pemanggilan proses() lama) masih berupa bytes/string,
+            # ditulis lewat file sementara juga agar penggantian file tetap atomik
+            if not isinstance(body, UploadFile):
+                if not isinstance(body, bytes):
+                    body = body.encode('utf-8')
+                upload = self.open_upload()
+                upload.write(body)
+                body = upload
+            body.commit(file_path)
+            self.cache.invalidate(file_path)
+            self.files.invalidate(file_path)
             return self.response(201, 'Created', f'File {file_path_str} berhasil dibuat', {})
         except Exception as e:
+            if isinstance(body, UploadFile):
+                body.discard()
             return self.response(500, 'Internal Server Error', str(e), {})
 
     def http_delete(self, object_address, headers):
@@ -166,6 +784,8 @@ class HttpServer:
 
         try:
             os.remove(file_path)
+            self.cache.invalidate(file_path)
+            self.files.invalidate(file_path)
             return self.response(200, 'OK', f'File {file_path_str} berhasil dihapus', {})
         except Exception as e:
             return self.response(500, 'Internal Server Error', str(e), {})
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+
+#cache response statis (file kecil) yang sudah dirender: header tetap
+#(Content-Length, Content-type, ETag, ...) dan body, termasuk varian
+#terkompresi (gzip/deflate) di samping versi identity. Dipakai bersama oleh
+#semua request dalam satu proses, dibatasi total byte dengan eviksi LRU.
+#Entry divalidasi ulang terhadap mtime/ukuran hasil stat() setiap kali dipakai
+
+
+class CacheEntry:
+    def __init__(self, mtime_ns, size):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        # varian per Content-Encoding (identity, gzip, deflate) -> (head, body)
+        self.variants = {}
+
+    def cost(self):
+        return sum(len(head) + len(body) for head, body in self.variants.values())
+
+
+class ResponseCache:
+    def __init__(self, budget=32 * 1024 * 1024, max_entry=1024 * 1024):
+        self.budget = budget
+        self.max_entry = max_entry
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def cacheable(self, st):
+        return st.st_size <= self.max_entry
+
+    def get(self, key, st, encoding='identity'):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size):
+                # file sudah berubah di disk
+                self._remove(key)
+                entry = None
+            variant = entry.variants.get(encoding) if entry is not None else None
+            if variant is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return variant
+
+    def put(self, key, st, head, body, encoding='identity'):
+        if len(head) + len(body) > self.budget:
+            return
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.mtime_ns != st.st_mtime_ns or entry.size != st.st_size:
+                if entry is not None:
+                    self._remove(key)
+                entry = CacheEntry(st.st_mtime_ns, st.st_size)
+            else:
+                self.used -= entry.cost()
+            entry.variants[encoding] = (head, body)
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.used += entry.cost()
+            while self.used > self.budget:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.used -= entry.cost()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.used,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
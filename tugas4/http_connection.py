@@ -0,0 +1,133 @@
+import socket
+import ssl
+import logging
+from http import KEEPALIVE_TIMEOUT, KEEPALIVE_MAX, FileRegion, StreamBody
+from http_parser import HttpParser, discard_unhandled
+from timer_wheel import Deadline, HEADER_TIMEOUT
+import phase_timing
+
+#loop per koneksi yang dipakai bersama oleh semua varian server blocking
+#(thread, thread pool, process, process pool). Satu koneksi bisa melayani
+#beberapa request (HTTP/1.1 keep-alive) sampai idle timeout atau batas request.
+#Timeout socket hanya membatasi satu recv/send; batas total per fase (header
+#harus lengkap dalam HEADER_TIMEOUT, body minimal MIN_RATE byte/detik) diawasi
+#timer wheel, sehingga client yang mengirim byte satu per satu (slowloris)
+#tidak bisa menahan thread worker selamanya
+
+
+#jumlah maksimum request pipelined yang diproses sebelum response dikirim
+PIPELINE_MAX = 16
+RECV_SIZE = 65536
+#batas jumlah buffer per sendmsg (IOV_MAX di Linux)
+IOV_MAX = 1024
+
+
+def send_buffers(connection, buffers):
+	#vectored write: semua buffer dikirim dengan sendmsg tanpa digabung
+	#lebih dulu; pengiriman yang terpotong dilanjutkan dari buffer terakhir
+	if isinstance(connection, ssl.SSLSocket):
+		#SSLSocket tidak mendukung sendmsg, record TLS dibuat dari data gabungan
+		connection.sendall(b''.join(buffers))
+		return
+	views = [memoryview(b) for b in buffers if len(b)]
+	i = 0
+	while i < len(views):
+		n = connection.sendmsg(views[i:i + IOV_MAX])
+		while n:
+			if n >= len(views[i]):
+				n -= len(views[i])
+				i += 1
+			else:
+				views[i] = views[i][n:]
+				n = 0
+
+
+def write_batch(connection, batch):
+	#header dan body bytes semua response dalam batch dikumpulkan menjadi satu
+	#sendmsg; body file dikirim dengan sendfile langsung dari file descriptor,
+	#body streaming dikirim per chunk begitu dihasilkan
+	buffers = []
+	for hasil in batch:
+		buffers += hasil.buffers()
+		if isinstance(hasil.body, FileRegion):
+			send_buffers(connection, buffers)
+			buffers = []
+			hasil.body.sendfile(connection)
+		elif isinstance(hasil.body, StreamBody):
+			send_buffers(connection, buffers)
+			buffers = []
+			for chunk in hasil.body.chunks():
+				send_buffers(connection, chunk)
+	if buffers:
+		send_buffers(connection, buffers)
+
+
+def serve_connection(connection, httpserver, trace=None):
+	#data dari recv_into langsung diberikan ke parser; body PUT besar ditulis
+	#parser ke file sementara, sehingga memori per koneksi tetap RECV_SIZE.
+	#trace: phase_timing.Trace dari thread accept (waktu antre di executor)
+	phase_timing.attach(trace)
+	parser = HttpParser(httpserver.open_upload)
+	chunk = memoryview(bytearray(RECV_SIZE))
+	served = 0
+	keep_alive = True
+	deadline = Deadline(connection)
+	try:
+		connection.settimeout(KEEPALIVE_TIMEOUT)
+		deadline.arm('idle', KEEPALIVE_TIMEOUT)
+		while keep_alive:
+			try:
+				n = connection.recv_into(chunk)
+			except socket.timeout:
+				break
+			if n == 0:
+				#juga terjadi saat deadline habis (socket di-shutdown reaper)
+				break
+			deadline.progress(n)
+			if trace is None:
+				trace = phase_timing.start('http')
+			else:
+				#request yang datang dalam beberapa potongan
+				phase_timing.lap('receive')
+			requests = parser.feed(chunk[:n])
+			phase_timing.lap('parse')
+			if requests:
+				#handler dan penulisan response tidak dihitung ke deadline
+				deadline.cancel()
+			#semua request pipelined dijawab berurutan, per batch PIPELINE_MAX
+			handled = 0
+			try:
+				for awal in range(0, len(requests), PIPELINE_MAX):
+					batch = []
+					for request in requests[awal:awal + PIPELINE_MAX]:
+						served += 1
+						handled += 1
+						hasil, keep_alive = httpserver.handle_request(request, served < KEEPALIVE_MAX)
+						batch.append(hasil)
+						if not keep_alive:
+							break
+					write_batch(connection, batch)
+					phase_timing.lap('send')
+					if not keep_alive:
+						break
+			finally:
+				#request sesudah request yang menutup koneksi (atau saat
+				#pengiriman gagal) tidak diproses, upload-nya dibuang
+				discard_unhandled(requests[handled:])
+			if requests and trace is not None:
+				phase_timing.finish('{} {}'.format(requests[0].method, requests[0].target))
+				trace = None
+			phase = parser.phase()
+			if phase != deadline.phase:
+				if phase == 'head':
+					deadline.arm('head', HEADER_TIMEOUT)
+				elif phase == 'body':
+					deadline.arm_rate('body')
+				else:
+					deadline.arm('idle', KEEPALIVE_TIMEOUT)
+	except OSError as e:
+		logging.debug("koneksi terputus: {}".format(e))
+	finally:
+		deadline.cancel()
+		parser.close()
+		connection.close()
@@ -0,0 +1,370 @@
+import os
+import json
+import fcntl
+import atexit
+import shutil
+import time
+import tempfile
+import threading
+from timer_wheel import shared_wheel
+
+#metrik HttpServer dalam format teks Prometheus (GET /metrics): jumlah request
+#per method dan status, request yang sedang diproses, byte body masuk/keluar,
+#dan histogram latensi log-linear per method.
+#
+#Setiap thread menulis ke shard miliknya sendiri tanpa lock (satu penulis per
+#shard); shard baru digabung saat /metrics dibaca. Shard thread yang sudah
+#berhenti (mis. satu thread per koneksi) dilipat ke satu shard retired,
+#sehingga jumlah shard tidak tumbuh dengan jumlah koneksi yang pernah
+#dilayani. Pada mode multi proses
+#(process pool, pre-fork, hybrid) setiap proses menyimpan snapshot-nya ke
+#HTTP_METRICS_DIR (dijadwalkan di timer wheel, paling sering sekali per
+#FLUSH_INTERVAL, di luar jalur request), dan proses yang
+#menjawab /metrics menggabungkan snapshot semua proses.
+
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'DELETE', 'LIST')
+FLUSH_INTERVAL = 1.0
+
+#histogram log-linear atas mikrodetik: setiap pangkat dua dibagi 2**SUB_BITS
+#bucket linear, sehingga galat relatif maksimal 1/8 di semua rentang
+SUB_BITS = 3
+SUB = 1 << SUB_BITS
+BUCKETS = 40 * SUB
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+#shard thread mati dilipat saat /metrics dibaca, atau saat jumlah shard
+#melewati batas ini
+MAX_SHARDS = 256
+
+#direktori snapshot mode multi proses, None jika hanya satu proses
+directory = os.environ.get('HTTP_METRICS_DIR')
+#counter gabungan proses yang sudah selesai (lihat Metrics.retire)
+ARCHIVE = 'archive.json'
+
+
+def enable_multiprocess(path=None):
+    """
+    Dipanggil proses induk sebelum membuat worker. Diwarisi worker lewat
+    fork maupun environment (ProcessPoolExecutor dengan spawn/forkserver).
+    """
+    global directory
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), 'http-metrics-{}'.format(os.getpid()))
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.startswith('metrics-') or name == ARCHIVE:
+            os.remove(os.path.join(path, name))
+    os.environ['HTTP_METRICS_DIR'] = path
+    directory = path
+    owner = os.getpid()
+    # hanya proses induk yang menghapus direktori saat berhenti
+    atexit.register(lambda: os.getpid() == owner and shutil.rmtree(path, ignore_errors=True))
+    return path
+
+
+def bucket_index(seconds):
+    v = int(seconds * 1000000)
+    if v < SUB:
+        return max(v, 0)
+    shift = v.bit_length() - SUB_BITS - 1
+    return min((shift + 1) * SUB + (v >> shift) - SUB, BUCKETS - 1)
+
+
+def bucket_upper(index):
+    """Batas atas bucket dalam detik."""
+    if index < SUB:
+        return (index + 1) / 1000000
+    shift = index // SUB - 1
+    mantissa = index % SUB + SUB
+    return ((mantissa + 1) << shift) / 1000000
+
+
+class Shard:
+    __slots__ = ('requests', 'bytes_in', 'bytes_out', 'in_flight', 'histograms')
+
+    def __init__(self):
+        # (method, status) -> jumlah
+        self.requests = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.in_flight = 0
+        # method -> [count per bucket..., total detik]
+        self.histograms = {}
+
+
+def merge_shard(target, shard):
+    # shard milik thread yang sudah berhenti, tidak ada lagi penulisnya
+    for key, n in shard.requests.items():
+        target.requests[key] = target.requests.get(key, 0) + n
+    target.bytes_in += shard.bytes_in
+    target.bytes_out += shard.bytes_out
+    target.in_flight += shard.in_flight
+    for method, hist in shard.histograms.items():
+        total = target.histograms.get(method)
+        if total is None:
+            target.histograms[method] = list(hist)
+        else:
+            for index, n in enumerate(hist):
+                total[index] += n
+
+
+def empty_snapshot():
+    return {'requests': {}, 'bytes_in': 0, 'bytes_out': 0, 'in_flight': 0, 'histograms': {}, 'gauges': {}}
+
+
+def merge_into(total, snapshot, gauges=True):
+    for key, n in snapshot['requests'].items():
+        total['requests'][key] = total['requests'].get(key, 0) + n
+    total['bytes_in'] += snapshot['bytes_in']
+    total['bytes_out'] += snapshot['bytes_out']
+    if gauges:
+        total['in_flight'] += snapshot['in_flight']
+        for name, value in snapshot.get('gauges', {}).items():
+            total['gauges'][name] = total['gauges'].get(name, 0) + value
+    for method, hist in snapshot['histograms'].items():
+        target = total['histograms'].setdefault(method, {'buckets': {}, 'sum': 0.0, 'count': 0})
+        for index, n in hist['buckets'].items():
+            target['buckets'][index] = target['buckets'].get(index, 0) + n
+        target['sum'] += hist['sum']
+        target['count'] += hist['count']
+    return total
+
+
+def load_snapshot(path):
+    try:
+        with open(path) as fp:
+            snapshot = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    # key JSON selalu string, indeks bucket dikembalikan ke int
+    for hist in snapshot['histograms'].values():
+        hist['buckets'] = {int(i): n for i, n in hist['buckets'].items()}
+    return snapshot
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class Metrics:
+    def __init__(self):
+        self.local = threading.local()
+        # (thread, shard) per thread yang pernah mencatat request
+        self.shards = []
+        self.retired = Shard()
+        # (prefix, fungsi -> dict) gauge di luar HttpServer, lihat add_gauges
+        self.gauge_sources = []
+        self.lock = threading.Lock()
+        self.flush_pending = False
+        if hasattr(os, 'register_at_fork'):
+            # proses anak mulai dari nol, data induk sudah ada di snapshot induk
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.local = threading.local()
+        self.shards = []
+        self.retired = Shard()
+        self.gauge_sources = []
+        self.lock = threading.Lock()
+        self.flush_pending = False
+
+    def add_gauges(self, prefix, source):
+        """
+        Mengekspor source() (dict nama -> nilai, mis. BoundedExecutor.stats)
+        sebagai gauge prefix+nama. Pada mode multi proses nilainya ikut
+        snapshot proses ini (juga proses yang tidak menjawab request, mis.
+        induk process pool) dan dijumlahkan antar proses.
+        """
+        self.gauge_sources.append((prefix, source))
+        self.schedule_flush()
+
+    def schedule_flush(self):
+        if directory is not None and not self.flush_pending:
+            self.flush_pending = True
+            shared_wheel().schedule(FLUSH_INTERVAL, self.flush)
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = Shard()
+            with self.lock:
+                if len(self.shards) >= MAX_SHARDS:
+                    self._fold_dead()
+                self.shards.append((threading.current_thread(), shard))
+            self.local.shard = shard
+            return shard
+
+    def _fold_dead(self):
+        # dipanggil dengan self.lock
+        alive = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                merge_shard(self.retired, shard)
+        self.shards = alive
+
+    def begin(self):
+        self.shard().in_flight += 1
+        return time.perf_counter()
+
+    def end(self, started, method, status, bytes_in, bytes_out):
+        durasi = time.perf_counter() - started
+        if method not in METHODS:
+            method = 'OTHER'
+        shard = self.shard()
+        shard.in_flight -= 1
+        key = (method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        shard.bytes_in += bytes_in
+        shard.bytes_out += bytes_out
+        hist = shard.histograms.get(method)
+        if hist is None:
+            hist = shard.histograms[method] = [0] * (BUCKETS + 1)
+        hist[bucket_index(durasi)] += 1
+        hist[BUCKETS] += durasi
+        self.schedule_flush()
+        return durasi
+
+    def snapshot(self):
+        total = empty_snapshot()
+        with self.lock:
+            self._fold_dead()
+            shards = [self.retired] + [shard for thread, shard in self.shards]
+        for shard in shards:
+            for (method, status), n in list(shard.requests.items()):
+                key = '{} {}'.format(method, status)
+                total['requests'][key] = total['requests'].get(key, 0) + n
+            total['bytes_in'] += shard.bytes_in
+            total['bytes_out'] += shard.bytes_out
+            total['in_flight'] += shard.in_flight
+            for method, hist in list(shard.histograms.items()):
+                target = total['histograms'].setdefault(method, {'buckets': {}, 'sum': 0.0, 'count': 0})
+                for index in range(BUCKETS):
+                    if hist[index]:
+                        target['buckets'][index] = target['buckets'].get(index, 0) + hist[index]
+                        target['count'] += hist[index]
+                target['sum'] += hist[BUCKETS]
+        for prefix, source in self.gauge_sources:
+            for name, value in source().items():
+                total['gauges'][prefix + name] = value
+        return total
+
+    def flush(self):
+        self.flush_pending = False
+        if directory is None:
+            return
+        path = os.path.join(directory, 'metrics-{}.json'.format(os.getpid()))
+        tmp = '{}.{}.tmp'.format(path, threading.get_ident())
+        try:
+            with open(tmp, 'w') as fp:
+                json.dump(self.snapshot(), fp)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        if self.gauge_sources:
+            # gauge berubah tanpa request di proses ini, snapshot diperbarui berkala
+            self.schedule_flush()
+
+    def retire(self):
+        """
+        Dipanggil proses berumur pendek (satu proses per koneksi) sebelum
+        keluar: counter-nya digabung ke ARCHIVE, bukan ditinggal sebagai
+        satu file per proses.
+        """
+        if directory is None:
+            return
+        archive = os.path.join(directory, ARCHIVE)
+        try:
+            with open(os.path.join(directory, '.lock'), 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                total = load_snapshot(archive) or empty_snapshot()
+                merge_into(total, self.snapshot(), gauges=False)
+                with open(archive + '.tmp', 'w') as fp:
+                    json.dump(total, fp)
+                os.replace(archive + '.tmp', archive)
+            own = os.path.join(directory, 'metrics-{}.json'.format(os.getpid()))
+            if os.path.exists(own):
+                os.remove(own)
+        except OSError:
+            pass
+
+    def collect(self):
+        total = self.snapshot()
+        if directory is None:
+            return total
+        own = 'metrics-{}.json'.format(os.getpid())
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return total
+        for name in names:
+            if name == ARCHIVE:
+                alive = False
+            elif name.startswith('metrics-') and name.endswith('.json') and name != own:
+                alive = pid_alive(int(name[8:-5]))
+            else:
+                continue
+            snapshot = load_snapshot(os.path.join(directory, name))
+            if snapshot is not None:
+                # counter worker yang sudah mati tetap dihitung, gauge-nya tidak
+                merge_into(total, snapshot, gauges=alive)
+        return total
+
+    def render(self, extra=None):
+        """Teks exposition Prometheus; extra: {nama_metrik: nilai} tambahan (gauge)."""
+        total = self.collect()
+        lines = [
+            '# HELP http_requests_total Jumlah request per method dan status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for key in sorted(total['requests']):
+            method, status = key.split(' ')
+            lines.append('http_requests_total{{method="{}",status="{}"}} {}'.format(method, status, total['requests'][key]))
+        lines += [
+            '# TYPE http_requests_in_flight gauge',
+            'http_requests_in_flight {}'.format(total['in_flight']),
+            '# TYPE http_request_body_bytes_total counter',
+            'http_request_body_bytes_total {}'.format(total['bytes_in']),
+            '# TYPE http_response_body_bytes_total counter',
+            'http_response_body_bytes_total {}'.format(total['bytes_out']),
+            '# HELP http_request_duration_seconds Waktu handle_request (tanpa waktu kirim).',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        quantiles = []
+        for method in sorted(total['histograms']):
+            hist = total['histograms'][method]
+            cumulative = 0
+            for index in sorted(hist['buckets']):
+                cumulative += hist['buckets'][index]
+                lines.append('http_request_duration_seconds_bucket{{method="{}",le="{:.6g}"}} {}'.format(method, bucket_upper(index), cumulative))
+            lines.append('http_request_duration_seconds_bucket{{method="{}",le="+Inf"}} {}'.format(method, hist['count']))
+            lines.append('http_request_duration_seconds_sum{{method="{}"}} {:.6f}'.format(method, hist['sum']))
+            lines.append('http_request_duration_seconds_count{{method="{}"}} {}'.format(method, hist['count']))
+            for q in QUANTILES:
+                quantiles.append('http_request_duration_quantile_seconds{{method="{}",quantile="{}"}} {:.6g}'.format(method, q, quantile(hist, q)))
+        if quantiles:
+            lines.append('# TYPE http_request_duration_quantile_seconds gauge')
+            lines += quantiles
+        gauges = dict(total['gauges'])
+        gauges.update(extra or {})
+        for name, value in sorted(gauges.items()):
+            lines.append('# TYPE {} gauge'.format(name))
+            lines.append('{} {}'.format(name, value))
+        return '\n'.join(lines) + '\n'
+
+
+def quantile(hist, q):
+    rank = q * hist['count']
+    cumulative = 0
+    for index in sorted(hist['buckets']):
+        cumulative += hist['buckets'][index]
+        if cumulative >= rank:
+            return bucket_upper(index)
+    return 0.0
@@ -0,0 +1,302 @@
+#parser request HTTP/1.x inkremental berbasis bytes. Front-end cukup memanggil
+#feed() dengan apa pun yang dikembalikan recv(); parser menyimpan posisi scan
+#sehingga biaya parsing tetap linear terhadap ukuran request, berapa pun
+#jumlah potongan datanya. Dipakai oleh semua varian server.
+#
+#Body boleh dibingkai dengan Content-Length atau Transfer-Encoding: chunked.
+#Body chunked di-decode sambil data datang: isi chunk langsung diteruskan ke
+#sink (file upload untuk PUT, buffer untuk lainnya) tanpa menunggu satu chunk
+#lengkap, sehingga ukuran chunk dari client tidak menentukan pemakaian memori.
+
+MAX_REQUEST_LINE = 8192
+MAX_HEADER_SIZE = 16384
+MAX_HEADERS = 100
+MAX_BODY = 1024 * 1024
+#body PUT yang lebih besar dari ini tidak ditampung di memori, tetapi
+#ditulis langsung ke sink dari open_upload() setiap kali data datang
+UPLOAD_BUFFER_MAX = 65536
+#baris ukuran chunk (heksadesimal + extension), dan jumlah digit ukurannya
+MAX_CHUNK_LINE = 1024
+MAX_CHUNK_DIGITS = 8
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+
+STATE_HEAD = 0
+STATE_BODY = 1
+STATE_UPLOAD = 2
+STATE_ERROR = 3
+STATE_CHUNKED = 4
+
+#posisi di dalam body chunked
+CHUNK_SIZE = 0
+CHUNK_DATA = 1
+CHUNK_CRLF = 2
+CHUNK_TRAILER = 3
+
+
+class ParseError(Exception):
+    def __init__(self, kode, message):
+        Exception.__init__(self, message)
+        self.kode = kode
+        self.message = message
+
+
+class HttpRequest:
+    def __init__(self, method, target, version, headers):
+        self.method = method
+        self.target = target
+        self.version = version
+        # nama header selalu huruf kecil
+        self.headers = headers
+        self.body = b""
+        # (kode, pesan) jika request tidak valid, request tetap dikembalikan
+        # agar urutan response untuk pipelining tidak berubah
+        self.error = None
+
+
+def discard_unhandled(requests):
+    """
+    Membuang body upload (file sementara) dari request yang sudah diparse
+    tetapi tidak akan diproses, mis. request pipelined sesudah request
+    yang menutup koneksi.
+    """
+    for request in requests:
+        if hasattr(request.body, 'discard'):
+            request.body.discard()
+
+
+class HttpParser:
+    def __init__(self, open_upload=None, upload_threshold=UPLOAD_BUFFER_MAX):
+        self.open_upload = open_upload
+        self.upload_threshold = upload_threshold
+        self.buf = bytearray()
+        self.scan = 0
+        self.state = STATE_HEAD
+        self.request = None
+        self.remaining = 0
+        self.chunk_state = CHUNK_SIZE
+        self.received = 0
+        self.streaming = False
+
+    def feed(self, data):
+        """
+        Menambahkan data dan mengembalikan list HttpRequest yang sudah lengkap,
+        berurutan sesuai kedatangannya.
+        """
+        requests = []
+        if self.state == STATE_ERROR:
+            return requests
+        if self.state == STATE_UPLOAD:
+            data = self._write_upload(data, requests)
+        self.buf += data
+        try:
+            while self.buf:
+                if self.state == STATE_HEAD:
+                    if not self._parse_head(requests):
+                        break
+                elif self.state == STATE_BODY:
+                    if len(self.buf) < self.remaining:
+                        break
+                    self.request.body = bytes(self.buf[:self.remaining])
+                    del self.buf[:self.remaining]
+                    self._finish(requests)
+                elif self.state == STATE_UPLOAD:
+                    sisa = bytes(self.buf)
+                    self.buf.clear()
+                    self.buf += self._write_upload(sisa, requests)
+                elif self.state == STATE_CHUNKED:
+                    if not self._parse_chunked(requests):
+                        break
+                else:
+                    break
+        except ParseError as e:
+            request = self.request or HttpRequest('', '', 'HTTP/1.0', {})
+            request.error = (e.kode, e.message)
+            requests.append(request)
+            self.close()
+            self.state = STATE_ERROR
+        return requests
+
+    def phase(self):
+        """
+        'idle' jika tidak ada request setengah jadi, 'head' selama header
+        belum lengkap, 'body' selama menunggu body (dipakai untuk deadline).
+        """
+        if self.state in (STATE_BODY, STATE_UPLOAD, STATE_CHUNKED):
+            return 'body'
+        if self.state == STATE_HEAD and self.buf:
+            return 'head'
+        return 'idle'
+
+    def close(self):
+        # membuang upload yang belum selesai (koneksi terputus/ditutup)
+        uploading = self.state == STATE_UPLOAD or (self.state == STATE_CHUNKED and self.streaming)
+        if uploading and self.request is not None:
+            self.request.body.discard()
+        self.request = None
+        self.buf.clear()
+
+    def _parse_head(self, requests):
+        # baris kosong sebelum request-line diabaikan (RFC 7230 3.5)
+        while self.buf[:2] == b"\r\n":
+            del self.buf[:2]
+            self.scan = 0
+        akhir = self.buf.find(b"\r\n\r\n", self.scan)
+        if akhir < 0:
+            # lanjutkan pencarian dari posisi terakhir, bukan dari awal buffer
+            self.scan = max(0, len(self.buf) - 3)
+            if self.buf.find(b"\r\n", 0, MAX_REQUEST_LINE) < 0 and len(self.buf) > MAX_REQUEST_LINE:
+                raise ParseError(414, 'URI Too Long')
+            if len(self.buf) > MAX_HEADER_SIZE:
+                raise ParseError(431, 'Request Header Fields Too Large')
+            return False
+        if akhir + 4 > MAX_HEADER_SIZE:
+            raise ParseError(431, 'Request Header Fields Too Large')
+        head = bytes(self.buf[:akhir]).decode('iso-8859-1')
+        del self.buf[:akhir + 4]
+        self.scan = 0
+
+        lines = head.split("\r\n")
+        if len(lines[0]) > MAX_REQUEST_LINE:
+            raise ParseError(414, 'URI Too Long')
+        parts = lines[0].split(" ")
+        if len(parts) == 2:
+            parts.append('HTTP/1.0')
+        if len(parts) != 3 or not parts[0] or not parts[2].upper().startswith('HTTP/'):
+            raise ParseError(400, 'Bad Request')
+        if len(lines) - 1 > MAX_HEADERS:
+            raise ParseError(431, 'Request Header Fields Too Large')
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            name = name.strip().lower()
+            if not sep or not name or line[0] in ' \t':
+                raise ParseError(400, 'Bad Request')
+            value = value.strip()
+            if name in headers:
+                if name == 'content-length':
+                    if headers[name] != value:
+                        raise ParseError(400, 'Bad Request')
+                    continue
+                headers[name] = headers[name] + ', ' + value
+            else:
+                headers[name] = value
+
+        method = parts[0].upper()
+        self.request = HttpRequest(method, parts[1], parts[2].upper(), headers)
+        if 'transfer-encoding' in headers:
+            self._start_chunked(method, headers)
+            return True
+        content_length = headers.get('content-length', '0')
+        # isdigit() saja juga menerima digit non-ASCII seperti '\xb2'
+        if not (content_length.isascii() and content_length.isdigit()):
+            raise ParseError(400, 'Bad Request')
+        self.remaining = int(content_length)
+
+        if self.remaining == 0:
+            self._finish(requests)
+        elif method == 'PUT' and self.remaining > self.upload_threshold and self.open_upload is not None:
+            self.request.body = self.open_upload()
+            self.state = STATE_UPLOAD
+        elif self.remaining > MAX_BODY:
+            raise ParseError(413, 'Payload Too Large')
+        else:
+            self.state = STATE_BODY
+        return True
+
+    def _start_chunked(self, method, headers):
+        if 'content-length' in headers:
+            # keduanya sekaligus adalah pola request smuggling (RFC 7230 3.3.3)
+            raise ParseError(400, 'Bad Request')
+        if headers['transfer-encoding'].lower() != 'chunked':
+            raise ParseError(501, 'Not Implemented')
+        self.chunk_state = CHUNK_SIZE
+        self.received = 0
+        # panjang total tidak diketahui: PUT selalu langsung ke file
+        self.streaming = method == 'PUT' and self.open_upload is not None
+        self.request.body = self.open_upload() if self.streaming else bytearray()
+        self.state = STATE_CHUNKED
+
+    def _parse_chunked(self, requests):
+        # satu langkah decoding; False jika perlu menunggu data berikutnya
+        if self.chunk_state == CHUNK_DATA:
+            n = min(len(self.buf), self.remaining)
+            data = bytes(self.buf[:n])
+            del self.buf[:n]
+            self.remaining -= n
+            self.received += n
+            if self.streaming:
+                self.request.body.write(data)
+            else:
+                self.request.body += data
+            if self.remaining == 0:
+                self.chunk_state = CHUNK_CRLF
+            return True
+        if self.chunk_state == CHUNK_CRLF:
+            if len(self.buf) < 2:
+                return False
+            if self.buf[:2] != b"\r\n":
+                raise ParseError(400, 'Bad Request')
+            del self.buf[:2]
+            self.chunk_state = CHUNK_SIZE
+            return True
+
+        akhir = self.buf.find(b"\r\n")
+        if akhir < 0:
+            if self.chunk_state == CHUNK_SIZE and len(self.buf) > MAX_CHUNK_LINE:
+                raise ParseError(400, 'Bad Request')
+            if self.chunk_state == CHUNK_TRAILER and len(self.buf) > MAX_HEADER_SIZE:
+                raise ParseError(431, 'Request Header Fields Too Large')
+            return False
+        line = bytes(self.buf[:akhir])
+        del self.buf[:akhir + 2]
+
+        if self.chunk_state == CHUNK_TRAILER:
+            # trailer field diabaikan, body selesai pada baris kosong;
+            # remaining menghitung ukuran trailer
+            self.remaining += akhir
+            if self.remaining > MAX_HEADER_SIZE:
+                raise ParseError(431, 'Request Header Fields Too Large')
+            if akhir == 0:
+                self._finish_chunked(requests)
+            return True
+
+        # chunk extension (";nama=nilai") diabaikan
+        size = line.split(b";", 1)[0].strip()
+        # hanya digit heksadesimal: int(size, 16) sendiri juga menerima
+        # '-1', '+5', '0x3' dan '1_0', yang merusak framing body
+        if not size or len(size) > MAX_CHUNK_DIGITS or size.strip(HEX_DIGITS):
+            raise ParseError(400, 'Bad Request')
+        self.remaining = int(size, 16)
+        if self.remaining == 0:
+            self.chunk_state = CHUNK_TRAILER
+        elif not self.streaming and self.received + self.remaining > MAX_BODY:
+            raise ParseError(413, 'Payload Too Large')
+        else:
+            self.chunk_state = CHUNK_DATA
+        return True
+
+    def _finish_chunked(self, requests):
+        if self.streaming:
+            self.request.body.close()
+        else:
+            self.request.body = bytes(self.request.body)
+        # handler melihat body seperti request ber-Content-Length biasa
+        del self.request.headers['transfer-encoding']
+        self.request.headers['content-length'] = str(self.received)
+        self.streaming = False
+        self._finish(requests)
+
+    def _write_upload(self, data, requests):
+        n = min(len(data), self.remaining)
+        self.request.body.write(data[:n])
+        self.remaining -= n
+        if self.remaining == 0:
+            self.request.body.close()
+            self._finish(requests)
+        return data[n:]
+
+    def _finish(self, requests):
+        requests.append(self.request)
+        self.request = None
+        self.state = STATE_HEAD
@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import itertools
+import threading
+import logging.handlers
+
+#pipeline logging bersama untuk semua server. Thread yang melayani request
+#hanya memasukkan LogRecord ke antrian (tanpa memformat pesan, tanpa I/O);
+#satu thread penulis di latar belakang memformat dan menulis per batch.
+#
+#   logger 'access'  satu baris terstruktur per request (ACCESS_LOG=path atau '-')
+#   logger 'events'  kejadian bervolume tinggi (koneksi baru, perintah diterima),
+#                    hanya 1 dari LOG_SAMPLE yang dicatat
+#   WARNING ke atas  dibatasi LOG_ERROR_RATE pesan per detik; yang terlewat
+#                    dihitung dan dilaporkan pada pesan berikutnya
+#
+#LOG_LEVEL mengatur level root logger (default WARNING).
+
+QUEUE_MAX = 65536
+BATCH = 512
+FLUSH_INTERVAL = 0.5
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+access_logger = logging.getLogger('access')
+events = logging.getLogger('events')
+
+_writer = None
+_handler = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat di thread pemanggil dan tidak pernah memblokir."""
+
+    def __init__(self, q):
+        logging.handlers.QueueHandler.__init__(self, q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # record hanya dipakai di proses ini, formatting ditunda ke thread penulis
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchHandler(logging.Handler):
+    """Mengumpulkan baris terformat dan menulisnya sekaligus saat flush()."""
+
+    def __init__(self, stream):
+        logging.Handler.__init__(self)
+        self.stream = stream
+        self.lines = []
+
+    def emit(self, record):
+        try:
+            self.lines.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if not self.lines:
+            return
+        data = '\n'.join(self.lines) + '\n'
+        self.lines = []
+        try:
+            self.stream.write(data)
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+
+class SampleFilter(logging.Filter):
+    """Meloloskan 1 dari setiap `every` record."""
+
+    def __init__(self, every):
+        logging.Filter.__init__(self)
+        self.every = max(1, every)
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        return next(self.counter) % self.every == 0
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket untuk record WARNING ke atas; dijalankan di thread penulis."""
+
+    def __init__(self, rate, burst=None):
+        logging.Filter.__init__(self)
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.tokens = self.burst
+        self.last = time.monotonic()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            self.suppressed += 1
+            return False
+        self.tokens -= 1
+        if self.suppressed:
+            record.msg = '{} ({} pesan lain dilewati)'.format(record.getMessage(), self.suppressed)
+            record.args = None
+            self.suppressed = 0
+        return True
+
+
+class LogWriter(threading.Thread):
+    def __init__(self, q, handlers):
+        threading.Thread.__init__(self, daemon=True)
+        self.queue = q
+        self.handlers = handlers
+
+    def run(self):
+        while True:
+            try:
+                record = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            batch = [record]
+            while len(batch) < BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = False
+            for record in batch:
+                if record is None:
+                    stop = True
+                    continue
+                for handler in self.handlers:
+                    if record.levelno >= handler.level:
+                        handler.handle(record)
+            for handler in self.handlers:
+                handler.flush()
+            if stop:
+                return
+
+    def stop(self):
+        try:
+            self.queue.put(None, timeout=1)
+        except queue.Full:
+            return
+        self.join(timeout=2)
+
+
+def _start_writer(handlers):
+    global _writer
+    q = queue.Queue(QUEUE_MAX)
+    _handler.queue = q
+    _writer = LogWriter(q, handlers)
+    _writer.start()
+
+
+def setup(level=None):
+    """Memasang pipeline pada root logger. Aman dipanggil lebih dari sekali."""
+    global _handler
+    if _handler is not None:
+        return
+    level = os.environ.get('LOG_LEVEL', level or logging.WARNING)
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+
+    main = BatchHandler(sys.stderr)
+    main.setFormatter(logging.Formatter(LOG_FORMAT))
+    main.addFilter(lambda record: record.name != 'access')
+    main.addFilter(RateLimitFilter(int(os.environ.get('LOG_ERROR_RATE', '10'))))
+    handlers = [main]
+
+    destination = os.environ.get('ACCESS_LOG')
+    if destination:
+        stream = sys.stderr if destination == '-' else open(destination, 'a', buffering=1024 * 1024)
+        access = BatchHandler(stream)
+        access.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        access.addFilter(lambda record: record.name == 'access')
+        handlers.append(access)
+        access_logger.setLevel(logging.INFO)
+    else:
+        # isEnabledFor(INFO) langsung False, log_access tidak melakukan apa-apa
+        access_logger.setLevel(logging.WARNING)
+
+    events.addFilter(SampleFilter(int(os.environ.get('LOG_SAMPLE', '100'))))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _handler = DeferredQueueHandler(None)
+    root.addHandler(_handler)
+    root.setLevel(level)
+    _start_writer(handlers)
+    atexit.register(shutdown)
+    if hasattr(os, 'register_at_fork'):
+        # thread penulis tidak ikut ter-fork: worker pre-fork memulai miliknya sendiri
+        os.register_at_fork(after_in_child=lambda: _start_writer(handlers))
+
+
+def shutdown():
+    """
+    Menulis semua record yang masih di antrian. Dipanggil otomatis lewat
+    atexit; proses anak yang keluar dengan os._exit harus memanggilnya sendiri.
+    """
+    if _writer is not None and _writer.is_alive():
+        _writer.stop()
+
+
+def log_access(kind, method, target, status, size, seconds):
+    if access_logger.isEnabledFor(logging.INFO):
+        access_logger.info('kind=%s method=%s path=%s status=%s bytes=%d ms=%.3f',
+                           kind, method or '-', str(target).replace(' ', '%20') or '-',
+                           status, size, seconds * 1000)
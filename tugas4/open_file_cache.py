@@ -0,0 +1,307 @@
+import os
+import time
+import errno
+import struct
+import logging
+import threading
+from collections import OrderedDict
+
+#cache file terbuka ala open_file_cache nginx. Key-nya path request apa
+#adanya, sehingga GET yang sering diminta tidak perlu normalisasi path,
+#pemeriksaan root, stat() maupun open(): fd yang sudah terbuka cukup
+#di-dup untuk setiap response. Entri dipercaya selama VALID_SECONDS, setelah
+#itu divalidasi ulang dengan satu stat() (inode, ukuran, mtime). Path yang
+#tidak ada juga disimpan (negatif), agar banjir 404 tidak menyentuh disk.
+#
+#PUT/DELETE dari server ini memanggil invalidate(). Perubahan dari luar
+#proses (proses worker lain, editor) terlihat setelah TTL habis, atau
+#langsung jika inotify aktif (OPEN_FILE_INOTIFY=1, hanya Linux).
+
+OPEN_FILE_MAX = int(os.environ.get('OPEN_FILE_MAX', '1024'))
+VALID_SECONDS = float(os.environ.get('OPEN_FILE_VALID', '2'))
+#dengan inotify entri hanya divalidasi ulang sebagai jaring pengaman
+VALID_SECONDS_INOTIFY = 60.0
+
+
+class FileInfo:
+    __slots__ = ('path', 'real', 'st', 'fd', 'is_dir', 'content_type', 'etag', 'error', 'checked')
+
+    def __init__(self, path, real, st, error=None):
+        # path relatif root (kunci ResponseCache), real = path absolut
+        self.path = path
+        self.real = real
+        self.st = st
+        self.fd = None
+        self.is_dir = False
+        self.content_type = None
+        self.etag = None
+        self.error = error
+        self.checked = time.monotonic()
+
+    def same_file(self, st):
+        return (self.st is not None and st.st_ino == self.st.st_ino and st.st_size == self.st.st_size
+                and st.st_mtime_ns == self.st.st_mtime_ns)
+
+
+class OpenFileCache:
+    def __init__(self, root='./', describe=None, max_entries=OPEN_FILE_MAX, valid=None, inotify=None):
+        """
+        describe(path, st) -> (content_type, etag) dihitung sekali per entri.
+        """
+        self.root = root
+        self.root_abs = os.path.abspath(root)
+        self.describe = describe
+        # satu entri memegang satu fd, sisakan fd untuk koneksi
+        try:
+            import resource
+            soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+            if soft != resource.RLIM_INFINITY:
+                max_entries = min(max_entries, soft // 4)
+        except ImportError:
+            pass
+        self.max_entries = max(1, max_entries)
+        if inotify is None:
+            inotify = os.environ.get('OPEN_FILE_INOTIFY') == '1'
+        self.watcher = None
+        if inotify:
+            try:
+                self.watcher = InotifyWatcher(self)
+            except OSError as e:
+                logging.warning("inotify tidak tersedia, memakai TTL saja: {}".format(e))
+        if valid is None:
+            valid = VALID_SECONDS_INOTIFY if self.watcher is not None else VALID_SECONDS
+        self.valid = valid
+        self.entries = OrderedDict()
+        # path absolut -> set key, untuk invalidate() dari PUT/DELETE/inotify
+        self.by_real = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # fd ikut diwarisi dan tetap valid; thread inotify tidak ikut fork
+        self.lock = threading.Lock()
+        if self.watcher is not None:
+            self.watcher.restart()
+
+    def resolve(self, target):
+        """(path relatif root, path absolut); PermissionError jika keluar dari root."""
+        path = os.path.join(self.root, target.lstrip('/'))
+        real = os.path.abspath(path)
+        if real != self.root_abs and not real.startswith(self.root_abs + os.sep):
+            raise PermissionError(errno.EACCES, 'di luar direktori root', target)
+        return path, real
+
+    def lookup(self, target):
+        """
+        FileInfo untuk path request. FileNotFoundError jika tidak ada (juga dari
+        entri negatif), PermissionError jika di luar root.
+        """
+        now = time.monotonic()
+        with self.lock:
+            info = self.entries.get(target)
+            if info is not None and now - info.checked < self.valid:
+                self.entries.move_to_end(target)
+                self.hits += 1
+                if info.error is not None:
+                    raise FileNotFoundError(info.error, os.strerror(info.error), target)
+                return info
+        path, real = self.resolve(target)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError as e:
+            self._store(target, FileInfo(path, real, None, e.errno))
+            raise
+        if info is not None and info.same_file(st):
+            with self.lock:
+                info.checked = now
+                self.revalidations += 1
+            return info
+        return self._store(target, self._load(path, real, st))
+
+    def _load(self, path, real, st):
+        info = FileInfo(path, real, st)
+        info.is_dir = os.path.isdir(path) if st is None else (st.st_mode & 0o170000) == 0o040000
+        if not info.is_dir:
+            try:
+                info.fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+                # stat dari fd yang sudah terbuka: isi fd dan metadata pasti cocok
+                info.st = os.fstat(info.fd)
+            except OSError:
+                info.fd = None
+            if self.describe is not None:
+                info.content_type, info.etag = self.describe(path, info.st)
+        return info
+
+    def _store(self, target, info):
+        with self.lock:
+            self.misses += 1
+            old = self.entries.pop(target, None)
+            if old is not None:
+                self._forget(target, old)
+            self.entries[target] = info
+            self.by_real.setdefault(info.real, set()).add(target)
+            while len(self.entries) > self.max_entries:
+                key, oldest = self.entries.popitem(last=False)
+                self._forget(key, oldest)
+                self.evictions += 1
+        if self.watcher is not None:
+            self.watcher.watch(os.path.dirname(info.real))
+        return info
+
+    def _forget(self, key, info):
+        keys = self.by_real.get(info.real)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_real[info.real]
+        if info.fd is not None:
+            os.close(info.fd)
+            info.fd = None
+
+    def open(self, info):
+        """
+        File object baru (fd hasil dup) untuk satu response, ditutup oleh
+        pemakainya. Offset fd dipakai bersama, jadi baca dengan pread/sendfile
+        ber-offset. Kembali ke open() biasa jika entri sudah dikeluarkan.
+        """
+        with self.lock:
+            if info.fd is not None:
+                return os.fdopen(os.dup(info.fd), 'rb')
+        return open(info.path, 'rb')
+
+    def invalidate(self, path):
+        real = os.path.abspath(path)
+        with self.lock:
+            for key in list(self.by_real.get(real, ())):
+                self._forget(key, self.entries.pop(key))
+
+    def invalidate_tree(self, directory):
+        prefix = os.path.abspath(directory) + os.sep
+        with self.lock:
+            for real in [r for r in self.by_real if r.startswith(prefix)]:
+                for key in list(self.by_real.get(real, ())):
+                    self._forget(key, self.entries.pop(key))
+
+    def clear(self):
+        with self.lock:
+            for key, info in list(self.entries.items()):
+                self._forget(key, info)
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'evictions': self.evictions,
+            }
+
+
+#konstanta inotify dari <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    Satu watch inotify per direktori yang berisi entri cache (lewat ctypes,
+    tanpa dependensi tambahan). Thread pembaca dimulai saat watch pertama.
+    """
+
+    def __init__(self, cache):
+        import ctypes
+        import ctypes.util
+        self.cache = cache
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify tidak didukung')
+        self.ctypes = ctypes
+        self.fd = None
+        self.wds = {}
+        self.dirs = {}
+        self.lock = threading.Lock()
+
+    def restart(self):
+        # thread pembaca milik proses induk; proses anak membuat inotify sendiri
+        self.lock = threading.Lock()
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = None
+        self.wds = {}
+        self.dirs = {}
+
+    def _start(self):
+        fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(self.ctypes.get_errno(), 'inotify_init1 gagal')
+        self.fd = fd
+        threading.Thread(target=self._run, args=(fd,), daemon=True).start()
+
+    def watch(self, directory):
+        with self.lock:
+            if directory in self.dirs:
+                return
+            try:
+                if self.fd is None:
+                    self._start()
+            except OSError as e:
+                logging.warning("inotify: {}".format(e))
+                return
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                # batas max_user_watches dsb.: direktori ini hanya mengandalkan TTL
+                logging.debug("inotify_add_watch {} gagal: {}".format(directory, os.strerror(self.ctypes.get_errno())))
+                self.dirs[directory] = None
+                return
+            self.wds[wd] = directory
+            self.dirs[directory] = wd
+
+    def _run(self, fd):
+        while True:
+            try:
+                data = os.read(fd, 65536)
+            except OSError as e:
+                logging.warning("inotify berhenti: {}".format(e))
+                return
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                self._handle(wd, mask, os.fsdecode(name))
+
+    def _handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # event hilang, tidak diketahui apa yang berubah
+            self.cache.clear()
+            return
+        with self.lock:
+            directory = self.wds.get(wd)
+            if mask & IN_IGNORED and directory is not None:
+                del self.wds[wd]
+                self.dirs.pop(directory, None)
+        if directory is None:
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            self.cache.invalidate_tree(directory)
+        if name:
+            self.cache.invalidate(os.path.join(directory, name))
@@ -3,3 +3,14 @@
 
 ab -n 100 -c 50 http://localhost:8887/testing.txt
 
+
+# server_async_http.py (selectors, port 8887) dibandingkan dengan
+# server_asyncio_stream_http.py (port 8886), keduanya dengan keep-alive
+ab -k -n 10000 -c 50 http://localhost:8887/testing.txt
+ab -k -n 10000 -c 50 http://localhost:8886/testing.txt
+
+# server_hybrid_http.py (proses x asyncio, port 8888) dibandingkan dengan
+# thread pool 20 thread (port 8885) dan process pool (port 8889)
+ab -k -n 100000 -c 500 http://localhost:8888/testing.txt
+ab -k -n 100000 -c 500 http://localhost:8885/testing.txt
+ab -k -n 100000 -c 500 http://localhost:8889/testing.txt
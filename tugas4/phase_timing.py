@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import atexit
+import threading
+import collections
+from http_metrics import bucket_index, bucket_upper, quantile
+
+#instrumentasi waktu per fase request (opt-in). Sebuah Trace dimulai per
+#request/batch dan disimpan di thread-local; kode di jalur request cukup
+#memanggil lap('nama_fase') di akhir setiap fase, waktu sejak lap sebelumnya
+#dihitung ke fase tersebut. Fase yang dipakai:
+#
+#   queue    menunggu worker executor (sejak accept)
+#   receive  menerima request dari socket
+#   parse    parsing request (HttpParser / FileProtocol.proses_string)
+#   handle   routing dan logika handler lainnya
+#   disk     baca/tulis file
+#   compress gzip/deflate
+#   base64   b64encode/b64decode
+#   json     json.dumps response
+#   encode   str -> bytes sebelum dikirim
+#   send     sendall/sendfile
+#
+#Aktif jika PHASE_TIMING diset, misalnya:
+#
+#   PHASE_TIMING=ring,hist python server_thread_pool_http.py
+#   PHASE_TIMING=jsonl:/tmp/phases.jsonl python file_server_threading_pool.py
+#
+#Saat tidak aktif, lap() hanya memeriksa satu variabel global.
+
+enabled = False
+sinks = []
+_local = threading.local()
+
+
+class Trace:
+    __slots__ = ('label', 'started', 'last', 'phases')
+
+    def __init__(self, label, started=None):
+        self.label = label
+        self.started = started if started is not None else time.perf_counter()
+        self.last = self.started
+        self.phases = {}
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+
+def begin(label):
+    """Membuat trace tanpa memasangnya di thread ini, untuk diteruskan ke worker."""
+    return Trace(label) if enabled else None
+
+
+def start(label, started=None):
+    """Memulai trace di thread ini; None jika instrumentasi tidak aktif."""
+    if not enabled:
+        return None
+    trace = Trace(label, started)
+    _local.trace = trace
+    return trace
+
+
+def attach(trace, phase='queue'):
+    """Melanjutkan trace yang dibuat di thread lain (mis. thread accept)."""
+    if trace is None:
+        return
+    trace.lap(phase)
+    _local.trace = trace
+
+
+def lap(phase):
+    if enabled:
+        trace = getattr(_local, 'trace', None)
+        if trace is not None:
+            trace.lap(phase)
+
+
+def label(name):
+    if enabled:
+        trace = getattr(_local, 'trace', None)
+        if trace is not None:
+            trace.label = name
+
+
+def finish(label=None):
+    if not enabled:
+        return
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        return
+    _local.trace = None
+    if label is not None:
+        trace.label = label
+    for sink in sinks:
+        sink.record(trace)
+
+
+def discard():
+    if enabled:
+        _local.trace = None
+
+
+class RingBufferSink:
+    """Menyimpan trace terakhir di memori."""
+
+    def __init__(self, size=4096):
+        self.traces = collections.deque(maxlen=size)
+
+    def record(self, trace):
+        self.traces.append((trace.label, trace.total(), dict(trace.phases)))
+
+    def recent(self, n=100):
+        return list(self.traces)[-n:]
+
+    def report(self):
+        return [dict(label=label, total=total, phases=phases) for label, total, phases in self.recent()]
+
+
+class JsonlSink:
+    """Satu baris JSON per trace, ditulis ke file dan di-flush paling sering sekali per detik."""
+
+    def __init__(self, path, flush_interval=1.0):
+        self.fp = open(path, 'a', buffering=1024 * 1024)
+        self.flush_interval = flush_interval
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def record(self, trace):
+        now = time.time()
+        line = json.dumps({'ts': now, 'pid': os.getpid(), 'label': trace.label,
+                           'total': trace.total(), 'phases': trace.phases})
+        with self.lock:
+            self.fp.write(line + '\n')
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.fp.flush()
+                self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self.fp.flush()
+
+    def report(self):
+        return None
+
+
+class HistogramSink:
+    """Histogram log-linear per fase (bucket sama dengan http_metrics)."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def record(self, trace):
+        with self.lock:
+            for phase, durasi in list(trace.phases.items()) + [('total', trace.total())]:
+                hist = self.histograms.get(phase)
+                if hist is None:
+                    hist = self.histograms[phase] = {'buckets': {}, 'sum': 0.0, 'count': 0}
+                index = bucket_index(durasi)
+                hist['buckets'][index] = hist['buckets'].get(index, 0) + 1
+                hist['sum'] += durasi
+                hist['count'] += 1
+
+    def report(self):
+        with self.lock:
+            return {
+                phase: {
+                    'count': hist['count'],
+                    'sum': hist['sum'],
+                    'p50': quantile(hist, 0.5),
+                    'p99': quantile(hist, 0.99),
+                    'max': bucket_upper(max(hist['buckets'])),
+                }
+                for phase, hist in self.histograms.items()
+            }
+
+
+def enable(*new_sinks):
+    global enabled
+    sinks.extend(new_sinks)
+    enabled = bool(sinks)
+
+
+def disable():
+    global enabled
+    enabled = False
+    del sinks[:]
+
+
+def configure(spec):
+    """spec: daftar dipisah koma dari ring[:ukuran], hist, jsonl:path."""
+    for item in spec.split(','):
+        name, sep, arg = item.strip().partition(':')
+        if name == 'ring':
+            enable(RingBufferSink(int(arg) if arg else 4096))
+        elif name == 'hist':
+            enable(HistogramSink())
+        elif name == 'jsonl':
+            enable(JsonlSink(arg or 'phases-{}.jsonl'.format(os.getpid())))
+        elif name:
+            raise ValueError("sink phase timing tidak dikenal: {}".format(name))
+
+
+def report():
+    return {type(sink).__name__: sink.report() for sink in sinks}
+
+
+if os.environ.get('PHASE_TIMING'):
+    configure(os.environ['PHASE_TIMING'])
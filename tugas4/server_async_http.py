@@ -1,61 +1,246 @@
 import socket
-import time
+import selectors
+import os
 import sys
-import asyncore
+import time
 import logging
-from http import HttpServer
+import collections
+from http import HttpServer, FileRegion, StreamBody, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
+from http_parser import HttpParser, discard_unhandled
+from socket_tuning import create_listener, get_profile, accept_batch
+import log_pipeline
+from timer_wheel import TimerWheel, Deadline, HEADER_TIMEOUT
+
+#server single-thread berbasis selectors (epoll di Linux), pengganti asyncore
+#yang sudah dihapus di Python 3.12. Setiap koneksi punya parser dan antrian
+#tulis sendiri; socket non-blocking, sehingga penulisan bisa terpotong dan
+#dilanjutkan saat socket kembali writable
 
 httpserver = HttpServer()
-rcv = ""
 
-class ProcessTheClient(asyncore.dispatcher_with_send):
+RECV_SIZE = 65536
+#berhenti membaca request baru selama data yang belum terkirim melebihi ini
+WRITE_HIGH_WATER = 1024 * 1024
+#chunk body streaming yang dibuat per giliran tulis, agar satu LIST besar
+#tidak memonopoli loop
+STREAM_CHUNKS_PER_WRITE = 8
+#batas jumlah buffer per sendmsg (IOV_MAX di Linux)
+IOV_MAX = 1024
+
+
+class ProcessTheClient:
+	def __init__(self, sock, address, selector, wheel):
+		self.sock = sock
+		self.address = address
+		self.selector = selector
+		self.parser = HttpParser(httpserver.open_upload)
+		#isi antrian: memoryview (bytes), [fp, offset, count] untuk sendfile,
+		#atau generator chunk StreamBody
+		self.outq = collections.deque()
+		self.pending = 0
+		self.served = 0
+		self.closing = False
+		self.deadline = Deadline(sock, wheel, self.close)
+		self.deadline.arm('idle', KEEPALIVE_TIMEOUT)
+		self.events = selectors.EVENT_READ
+		selector.register(sock, self.events, self)
+
+	def update_deadline(self):
+		if self.outq:
+			#client yang tidak membaca response: batas tanpa kemajuan kirim
+			self.deadline.arm('write', KEEPALIVE_TIMEOUT)
+			return
+		phase = self.parser.phase()
+		if phase == self.deadline.phase:
+			return
+		if phase == 'head':
+			self.deadline.arm('head', HEADER_TIMEOUT)
+		elif phase == 'body':
+			self.deadline.arm_rate('body')
+		else:
+			self.deadline.arm('idle', KEEPALIVE_TIMEOUT)
+
+	def update_events(self):
+		events = 0
+		if not self.closing and self.pending < WRITE_HIGH_WATER:
+			events |= selectors.EVENT_READ
+		if self.outq:
+			events |= selectors.EVENT_WRITE
+		if events != self.events:
+			self.events = events
+			self.selector.modify(self.sock, events, self)
+
 	def handle_read(self):
-		global rcv
-		data = self.recv(1024)
-		if data:
-			d = data.decode()
-			rcv = rcv + d
-			if rcv[-2:] == '\r\n':
-				# end of command, proses string
-				logging.warning("data dari client: {}".format(rcv))
-				hasil = httpserver.proses(rcv)
-				#hasil sudah dalam bentuk bytes
-				hasil = hasil + "\r\n\r\n".encode()
-				#agar bisa dioperasikan dengan string \r\n\r\n maka harus diencode dulu => bytes
-				logging.warning("balas ke  client: {}".format(hasil))
-				self.send(hasil) #hasil sudah dalam bentuk bytes, kirimkan balik ke client
-				rcv = ""
-				self.close()
-
-		#self.send('HTTP/1.1 200 OK \r\n\r\n'.encode())
-			#self.send("{}" . format(httpserver.proses(d)))
-		self.close()
-
-class Server(asyncore.dispatcher):
-	def __init__(self,portnumber):
-		asyncore.dispatcher.__init__(self)
-		self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.set_reuse_addr()
-		self.bind(('',portnumber))
-		self.listen(1)
-		logging.warning("running on port {}" . format(portnumber))
+		try:
+			data = self.sock.recv(RECV_SIZE)
+		except (BlockingIOError, InterruptedError):
+			return
+		if not data:
+			self.close()
+			return
+		self.deadline.progress(len(data))
+		requests = self.parser.feed(data)
+		for i, request in enumerate(requests):
+			self.served += 1
+			hasil, keep_alive = httpserver.handle_request(request, self.served < KEEPALIVE_MAX)
+			self.enqueue(hasil)
+			if not keep_alive:
+				self.closing = True
+				#request pipelined sesudahnya tidak diproses
+				discard_unhandled(requests[i + 1:])
+				break
+		self.handle_write()
+
+	def enqueue(self, hasil):
+		#header dan body masuk antrian sebagai buffer terpisah, handle_write
+		#mengirim buffer yang berurutan sekaligus dengan sendmsg
+		for data in hasil.buffers():
+			self.push(data)
+		body = hasil.body
+		if isinstance(body, FileRegion):
+			for part in body.parts:
+				if isinstance(part, bytes):
+					self.push(part)
+				else:
+					self.outq.append([body.fp, part[0], part[1]])
+					self.pending += part[1]
+			self.outq.append([body.fp, 0, 0])
+		elif isinstance(body, StreamBody):
+			self.outq.append(body.chunks())
+
+	def push(self, data):
+		if len(data):
+			self.outq.append(memoryview(data))
+			self.pending += len(data)
+
+	def send_views(self):
+		#sendmsg atas memoryview berurutan di depan antrian; mengembalikan
+		#False jika socket tidak menerima semuanya
+		views = []
+		for item in self.outq:
+			if not isinstance(item, memoryview) or len(views) == IOV_MAX:
+				break
+			views.append(item)
+		n = self.sock.sendmsg(views)
+		self.pending -= n
+		for view in views:
+			if n < len(view):
+				self.outq[0] = view[n:]
+				return False
+			n -= len(view)
+			self.outq.popleft()
+		return True
+
+	def handle_write(self):
+		produced = 0
+		try:
+			while self.outq:
+				item = self.outq[0]
+				if isinstance(item, memoryview):
+					if not self.send_views():
+						break
+					continue
+				elif isinstance(item, list):
+					fp, offset, count = item
+					if count == 0:
+						#penanda akhir body file
+						fp.close()
+					else:
+						n = os.sendfile(self.sock.fileno(), fp.fileno(), offset, count)
+						if n == 0:
+							raise OSError("file terpotong saat dikirim")
+						self.pending -= n
+						if n < count:
+							item[1] += n
+							item[2] -= n
+							break
+				else:
+					#chunk berikutnya diambil hanya saat socket siap menerima
+					if produced == STREAM_CHUNKS_PER_WRITE:
+						break
+					chunk = next(item, None)
+					if chunk is not None:
+						produced += 1
+						for data in reversed(chunk):
+							self.outq.appendleft(memoryview(data))
+							self.pending += len(data)
+						continue
+				self.outq.popleft()
+		except (BlockingIOError, InterruptedError):
+			pass
+		except OSError as e:
+			logging.debug("koneksi {} terputus: {}".format(self.address, e))
+			self.close()
+			return
+		if not self.outq and self.closing:
+			self.close()
+			return
+		self.update_events()
+		self.update_deadline()
+
+	def close(self):
+		if self.sock is None:
+			return
+		self.deadline.cancel()
+		self.selector.unregister(self.sock)
+		self.sock.close()
+		self.sock = None
+		self.parser.close()
+		for item in self.outq:
+			if isinstance(item, list):
+				item[0].close()
+			elif not isinstance(item, memoryview):
+				item.close()
+		self.outq.clear()
+
+
+class Server:
+	def __init__(self, portnumber):
+		self.selector = selectors.DefaultSelector()
+		self.profile = get_profile()
+		self.my_socket = create_listener(('', portnumber), self.profile)
+		self.my_socket.setblocking(False)
+		self.selector.register(self.my_socket, selectors.EVENT_READ, None)
+		#deadline idle/header/body semua koneksi, dimajukan dari loop ini
+		self.wheel = TimerWheel()
+		logging.warning("running on port {}".format(portnumber))
 
 	def handle_accept(self):
-		pair = self.accept()
-		if pair is not None:
-			sock, addr = pair
-			logging.warning("connection from {}" . format(repr(addr)))
-			handler = ProcessTheClient(sock)
+		#paling banyak accept_batch koneksi per wakeup, agar serbuan koneksi
+		#baru tidak menahan pelayanan koneksi yang sudah ada
+		for sock, addr in accept_batch(self.my_socket, self.profile):
+			sock.setblocking(False)
+			ProcessTheClient(sock, addr, self.selector, self.wheel)
+
+	def loop(self):
+		while True:
+			for key, mask in self.selector.select(timeout=self.wheel.tick):
+				client = key.data
+				if client is None:
+					self.handle_accept()
+					continue
+				try:
+					if mask & selectors.EVENT_READ and client.sock is not None:
+						client.handle_read()
+					if mask & selectors.EVENT_WRITE and client.sock is not None:
+						client.handle_write()
+				except Exception:
+					#kesalahan satu koneksi tidak boleh menghentikan loop
+					#yang melayani semua koneksi lain
+					logging.exception("kesalahan pada koneksi {}".format(client.address))
+					client.close()
+			self.wheel.advance()
+
 
 def main():
+	log_pipeline.setup()
 	portnumber=8887
 	try:
 		portnumber=int(sys.argv[1])
 	except:
 		pass
 	svr = Server(portnumber)
-	asyncore.loop()
+	svr.loop()
 
 if __name__=="__main__":
 	main()
-
@@ -1,46 +1,310 @@
 from socket import *
 import socket
-import time
-import sys
-import logging
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
-from http import HttpServer
+import collections
+import weakref
+from http import HttpServer, FileRegion, StreamBody, UploadFile, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX
+from http_connection import PIPELINE_MAX
+from http_parser import HttpParser, discard_unhandled
+from socket_tuning import create_listener, get_profile
+from timer_wheel import TimerWheel, Deadline, HEADER_TIMEOUT
+import phase_timing
+import log_pipeline
+from log_pipeline import events
 
 httpserver = HttpServer()
 
+#semua pekerjaan yang menyentuh disk (handler HttpServer, penulisan upload)
+#dijalankan di executor terbatas ini, event loop hanya parsing dan menulis socket
+DISK_WORKERS = 8
+UPLOAD_CHUNK = 65536
+executor = ThreadPoolExecutor(DISK_WORKERS)
+
+
+_wheels = weakref.WeakKeyDictionary()
+
+
+def loop_wheel(loop):
+	#timer wheel per event loop untuk deadline header/body, dimajukan oleh
+	#callback berkala di loop itu sendiri sehingga callback timer (menutup
+	#transport) berjalan di thread loop
+	wheel = _wheels.get(loop)
+	if wheel is None:
+		wheel = _wheels[loop] = TimerWheel()
+		def tick():
+			wheel.advance()
+			loop.call_later(wheel.tick, tick)
+		loop.call_later(wheel.tick, tick)
+	return wheel
+
+
+def handle_batch(requests, served, trace=None):
+	#dijalankan di thread executor: beberapa request pipelined sekaligus,
+	#berhenti setelah request yang menutup koneksi. Pengiriman terjadi di
+	#event loop dan tidak termasuk dalam trace
+	phase_timing.attach(trace)
+	hasil = []
+	for request in requests:
+		served += 1
+		response, keep_alive = httpserver.handle_request(request, served < KEEPALIVE_MAX)
+		hasil.append((response, keep_alive))
+		if not keep_alive:
+			break
+	phase_timing.finish('{} {}'.format(requests[0].method, requests[0].target))
+	return hasil
+
+
+class OffloadedUpload(UploadFile):
+	"""
+	UploadFile yang ditulis oleh thread executor. Selama satu potongan masih
+	ditulis, pembacaan socket dihentikan sehingga buffer memori tetap kecil.
+	"""
+	def __init__(self, protocol):
+		UploadFile.__init__(self, './')
+		self.protocol = protocol
+		self.buffer = bytearray()
+		self.inflight = None
+		self.error = None
+
+	def write(self, data):
+		self.buffer += data
+		self.size += len(data)
+		if len(self.buffer) >= UPLOAD_CHUNK and self.inflight is None:
+			self.flush()
+
+	def flush(self):
+		data = bytes(self.buffer)
+		self.buffer.clear()
+		loop = asyncio.get_running_loop()
+		self.protocol.pause('upload')
+		self.inflight = loop.run_in_executor(executor, self.fp.write, data)
+		self.inflight.add_done_callback(self.written)
+
+	def written(self, fut):
+		self.inflight = None
+		if fut.exception() is not None:
+			self.error = fut.exception()
+		if len(self.buffer) >= UPLOAD_CHUNK and self.error is None:
+			self.flush()
+		else:
+			self.protocol.resume('upload')
+
+	def close(self):
+		#file ditutup oleh commit()/discard() setelah drain()
+		pass
+
+	async def drain(self):
+		while self.inflight is not None:
+			await asyncio.wait([self.inflight])
+		if self.error is not None:
+			raise self.error
+		if self.buffer:
+			data = bytes(self.buffer)
+			self.buffer.clear()
+			await asyncio.get_running_loop().run_in_executor(executor, self.fp.write, data)
+
+	def discard(self):
+		if self.inflight is not None:
+			self.inflight.add_done_callback(lambda fut: UploadFile.discard(self))
+		else:
+			UploadFile.discard(self)
+
+
 class ProcessTheClient(asyncio.Protocol):
 		def connection_made(self, transport):
 			peername = transport.get_extra_info('peername')
-			print('Connection from {}'.format(peername))
+			events.info("connection from %s", peername)
 			self.transport = transport
-			self.rcv = ""
+			self.parser = HttpParser(self.open_upload)
+			self.pending = collections.deque()
+			self.served = 0
+			self.idle_timer = None
+			self.worker = None
+			self.paused = set()
+			self.write_paused = None
+			#idle timer diperbarui setiap data datang; header harus lengkap dalam
+			#HEADER_TIMEOUT dan body mengalir minimal MIN_RATE byte/detik
+			#(slowloris) diawasi deadline terpisah
+			self.deadline = Deadline(None, loop_wheel(asyncio.get_running_loop()), self.transport.close)
+			self.reset_idle_timer()
+
+		def open_upload(self):
+			return OffloadedUpload(self)
+
+		def reset_idle_timer(self):
+			#koneksi keep-alive yang menganggur ditutup setelah KEEPALIVE_TIMEOUT
+			if self.idle_timer is not None:
+				self.idle_timer.cancel()
+			loop = asyncio.get_running_loop()
+			self.idle_timer = loop.call_later(KEEPALIVE_TIMEOUT, self.idle)
+
+		def idle(self):
+			#koneksi yang sedang mengirim response (mis. download besar) tidak dianggap idle
+			if self.worker is not None:
+				self.reset_idle_timer()
+			else:
+				self.transport.close()
+
+		def pause(self, alasan):
+			if not self.paused:
+				self.transport.pause_reading()
+			self.paused.add(alasan)
+
+		def resume(self, alasan):
+			self.paused.discard(alasan)
+			if not self.paused and not self.transport.is_closing():
+				self.transport.resume_reading()
+
+		def pause_writing(self):
+			#buffer tulis transport penuh, worker menunggu sampai resume_writing
+			self.write_paused = asyncio.get_running_loop().create_future()
+
+		def resume_writing(self):
+			if self.write_paused is not None:
+				self.write_paused.set_result(None)
+				self.write_paused = None
+
+		def connection_lost(self, exc):
+			if self.idle_timer is not None:
+				self.idle_timer.cancel()
+			self.deadline.cancel()
+			self.parser.close()
+			#request yang sudah diparse tetapi belum diproses
+			discard_unhandled(self.pending)
+			self.pending.clear()
+			self.resume_writing()
+			if self.worker is not None:
+				self.worker.cancel()
+
 		def data_received(self, data: bytes) -> None:
+			self.reset_idle_timer()
+			self.deadline.progress(len(data))
+			self.pending.extend(self.parser.feed(data))
+			self.update_deadline()
+			if len(self.pending) > PIPELINE_MAX:
+				self.pause('pipeline')
+			if self.pending and self.worker is None:
+				self.worker = asyncio.ensure_future(self.process())
+
+		def update_deadline(self):
+			phase = self.parser.phase()
+			if phase == self.deadline.phase:
+				return
+			if phase == 'head':
+				self.deadline.arm('head', HEADER_TIMEOUT)
+			elif phase == 'body':
+				self.deadline.arm_rate('body')
+			else:
+				self.deadline.cancel()
+
+		async def process(self):
+			#response untuk request pipelined ditulis berurutan oleh satu worker per koneksi
+			loop = asyncio.get_running_loop()
+			batch = []
+			try:
+				while self.pending:
+					batch = []
+					while self.pending and len(batch) < PIPELINE_MAX:
+						request = self.pending.popleft()
+						batch.append(request)
+						if isinstance(request.body, OffloadedUpload):
+							try:
+								await request.body.drain()
+							except OSError:
+								#gagal menulis ke disk, handler akan menjawab 500
+								request.error = (500, 'Internal Server Error')
+							break
+					if len(self.pending) <= PIPELINE_MAX:
+						self.resume('pipeline')
+					diproses = loop.run_in_executor(executor, handle_batch, batch, self.served, phase_timing.begin('http'))
+					#sejak di sini batch milik thread executor
+					batch, dikirim = [], batch
+					hasil = await diproses
+					#handle_batch berhenti setelah request yang menutup koneksi
+					discard_unhandled(dikirim[len(hasil):])
+					self.served += len(hasil)
+					for response, keep_alive in hasil:
+						await self.respond(response)
+						if not keep_alive:
+							self.transport.close()
+							return
+			except (ConnectionError, RuntimeError, asyncio.CancelledError):
+				#batch yang diambil dari antrian tetapi belum diserahkan ke executor
+				discard_unhandled(batch)
+				self.transport.abort()
+			finally:
+				self.worker = None
+
+		async def respond(self, response):
+			if self.transport.is_closing():
+				if isinstance(response.body, FileRegion):
+					response.body.fp.close()
+				elif isinstance(response.body, StreamBody):
+					response.body.close()
+				raise ConnectionError("koneksi sudah ditutup")
+			#header dan body ditulis sebagai buffer terpisah (writelines)
+			self.transport.writelines(response.buffers())
+			if isinstance(response.body, FileRegion):
+				await self.send_file(response.body)
+			elif isinstance(response.body, StreamBody):
+				await self.send_stream(response.body)
+			if self.write_paused is not None:
+				await self.write_paused
+
+		async def send_stream(self, body):
+			#generator body (mis. scandir untuk LIST) membaca disk, sehingga
+			#setiap chunk dibuat di executor; penulisan menunggu buffer transport
+			loop = asyncio.get_running_loop()
+			chunks = body.chunks()
+			try:
+				while True:
+					chunk = await loop.run_in_executor(executor, next, chunks, None)
+					if chunk is None:
+						break
+					if self.transport.is_closing():
+						raise ConnectionError("koneksi sudah ditutup")
+					self.transport.writelines(chunk)
+					if self.write_paused is not None:
+						await self.write_paused
+			finally:
+				try:
+					chunks.close()
+				except ValueError:
+					#dibatalkan saat executor masih membuat chunk; generator
+					#ditutup oleh garbage collector setelah thread itu selesai
+					pass
+
+		async def send_file(self, region):
+			loop = asyncio.get_running_loop()
 			try:
-				d = data.decode()
-				self.rcv=self.rcv+d
-				if self.rcv[-2:]=='\r\n':
-					hasil = httpserver.proses(self.rcv)
-					hasil=hasil+"\r\n\r\n".encode()
-					self.transport.write(hasil)
-					self.transport.close()
-					self.rcv=""
-			except OSError as e:
-				pass
+				#os.sendfile langsung ke socket jika transport mendukung,
+				#jika tidak asyncio membaca file lewat executor
+				for part in region.parts:
+					if isinstance(part, bytes):
+						self.transport.write(part)
+					else:
+						await loop.sendfile(self.transport, region.fp, part[0], part[1])
+			finally:
+				region.fp.close()
 
 
 
 async def Server():
 	loop = asyncio.get_running_loop()
 
+	#create_server memanggil listen() lagi; tanpa backlog dari profil
+	#nilainya kembali ke default asyncio (100)
+	profile = get_profile()
 	server = await loop.create_server(
 		lambda: ProcessTheClient(),
-		'0.0.0.0', 8886)
+		sock=create_listener(('0.0.0.0', 8886), profile),
+		backlog=profile['backlog'])
 
 	async with server:
 		await server.serve_forever()
 
 if __name__=="__main__":
+	log_pipeline.setup()
 	asyncio.run(Server())
 
@@ -0,0 +1,104 @@
+import os
+import sys
+import logging
+import asyncio
+from server_prefork_http import supervise
+import http_metrics
+import log_pipeline
+from socket_tuning import create_listener, get_profile
+from server_asyncio_stream_http import ProcessTheClient
+
+#mode hybrid: pre-fork seperti server_prefork_http.py (listener SO_REUSEPORT
+#per worker, supervisor di proses induk), tetapi setiap worker menjalankan
+#event loop asyncio dengan protocol dari server_asyncio_stream_http.py.
+#Skala per core dari proses, kepadatan koneksi dari asyncio.
+#
+#pemakaian: python server_hybrid_http.py [jumlah_worker] [maks_koneksi_per_worker] [pin_cpu 0/1] [port]
+
+PORT = 8888
+MAX_CONNECTIONS = 10000
+
+
+class LimitedClient(ProcessTheClient):
+	def __init__(self, slots):
+		self.slots = slots
+
+	def connection_lost(self, exc):
+		ProcessTheClient.connection_lost(self, exc)
+		self.slots.release()
+
+
+async def serve(port, max_connections):
+	loop = asyncio.get_running_loop()
+	profile = get_profile()
+	my_socket = create_listener(('0.0.0.0', port), profile, reuseport=True)
+	my_socket.setblocking(False)
+	#slot koneksi habis -> worker berhenti accept, koneksi baru menunggu di
+	#backlog kernel atau diambil worker lain
+	slots = asyncio.Semaphore(max_connections)
+	while True:
+		await slots.acquire()
+		try:
+			connection, client_address = await loop.sock_accept(my_socket)
+		except OSError as e:
+			slots.release()
+			logging.error("accept gagal: {}".format(e))
+			continue
+		await accept_one(loop, slots, connection)
+		#koneksi lain yang sudah antre di backlog diambil sekaligus, tanpa
+		#kembali ke event loop untuk setiap accept
+		batch = []
+		while len(batch) + 1 < profile['accept_batch'] and not slots.locked():
+			try:
+				connection, client_address = my_socket.accept()
+			except (BlockingIOError, InterruptedError):
+				break
+			except OSError as e:
+				logging.error("accept gagal: {}".format(e))
+				break
+			await slots.acquire()
+			batch.append(connection)
+		for connection in batch:
+			await accept_one(loop, slots, connection)
+
+
+async def accept_one(loop, slots, connection):
+	#slot sudah diambil oleh pemanggil
+	try:
+		await loop.connect_accepted_socket(lambda: LimitedClient(slots), connection)
+	except OSError:
+		slots.release()
+		connection.close()
+
+
+def worker(slot, max_connections, pin_cpu, port):
+	if pin_cpu and hasattr(os, 'sched_setaffinity'):
+		cpus = sorted(os.sched_getaffinity(0))
+		os.sched_setaffinity(0, {cpus[slot % len(cpus)]})
+	asyncio.run(serve(port, max_connections))
+
+
+def Server(workers, max_connections, pin_cpu, port):
+	logging.warning("hybrid server port {}: {} worker x {} koneksi, pin cpu {}".format(port, workers, max_connections, pin_cpu))
+	http_metrics.enable_multiprocess()
+	supervise(workers, worker, (max_connections, pin_cpu, port))
+
+
+def main():
+	log_pipeline.setup()
+	workers = os.cpu_count() or 1
+	max_connections = MAX_CONNECTIONS
+	pin_cpu = False
+	port = PORT
+	if len(sys.argv) > 1:
+		workers = int(sys.argv[1])
+	if len(sys.argv) > 2:
+		max_connections = int(sys.argv[2])
+	if len(sys.argv) > 3:
+		pin_cpu = sys.argv[3] == '1'
+	if len(sys.argv) > 4:
+		port = int(sys.argv[4])
+	Server(workers, max_connections, pin_cpu, port)
+
+if __name__=="__main__":
+	main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from http import HttpServer
+from http_connection import serve_connection
+import http_metrics
+from socket_tuning import create_listener
+import phase_timing
+import log_pipeline
+from work_queue import BoundedExecutor, reject
+
+#mode pre-fork: N proses worker yang berumur panjang, masing-masing membuka
+#listener sendiri pada port yang sama dengan SO_REUSEPORT sehingga kernel yang
+#membagi koneksi ke worker. Tidak ada socket yang perlu dipickle antar proses.
+#Proses induk hanya menjadi supervisor: worker yang mati langsung diganti.
+#
+#pemakaian: python server_prefork_http.py [jumlah_worker] [thread_per_worker] [port]
+
+PORT = 8889
+THREADS_PER_WORKER = 8
+#koneksi yang boleh menunggu thread di setiap worker; selebihnya dijawab 503
+QUEUE_PER_WORKER = 64
+#worker yang mati kurang dari ini setelah dibuat dianggap crash loop
+MIN_WORKER_LIFETIME = 1.0
+
+
+def worker(slot, threads, port):
+	#HttpServer (dan cache response-nya) dibuat per proses worker
+	httpserver = HttpServer()
+	my_socket = create_listener(('0.0.0.0', port), reuseport=True)
+	with BoundedExecutor(ThreadPoolExecutor(threads), threads, QUEUE_PER_WORKER) as executor:
+		httpserver.metrics.add_gauges('http_executor_', executor.stats)
+		while True:
+			connection, client_address = my_socket.accept()
+			trace = phase_timing.begin('http')
+			if executor.try_submit(serve_connection, connection, httpserver, trace) is None:
+				reject(connection, httpserver.busy())
+
+
+def spawn(target, slot, args):
+	pid = os.fork()
+	if pid == 0:
+		signal.signal(signal.SIGTERM, signal.SIG_DFL)
+		signal.signal(signal.SIGINT, signal.SIG_DFL)
+		try:
+			target(slot, *args)
+		except Exception as e:
+			logging.error("worker {} berhenti: {}".format(os.getpid(), e))
+		finally:
+			log_pipeline.shutdown()
+			os._exit(1)
+	return pid
+
+
+def stop_server(signum, frame):
+	raise SystemExit(0)
+
+
+def supervise(workers, target, args):
+	#menjalankan target(slot, *args) di setiap worker dan mengganti worker yang
+	#mati dengan slot yang sama (dipakai juga oleh server_hybrid_http.py)
+	if not hasattr(socket, 'SO_REUSEPORT'):
+		raise RuntimeError("SO_REUSEPORT tidak didukung di platform ini")
+	children = {}
+	for slot in range(workers):
+		children[spawn(target, slot, args)] = (slot, time.monotonic())
+
+	signal.signal(signal.SIGTERM, stop_server)
+	signal.signal(signal.SIGINT, stop_server)
+	try:
+		while True:
+			pid, status = os.wait()
+			child = children.pop(pid, None)
+			if child is None:
+				continue
+			slot, started = child
+			logging.warning("worker {} mati (status {}), membuat pengganti".format(pid, status))
+			if time.monotonic() - started < MIN_WORKER_LIFETIME:
+				time.sleep(MIN_WORKER_LIFETIME)
+			children[spawn(target, slot, args)] = (slot, time.monotonic())
+	finally:
+		for pid in children:
+			try:
+				os.kill(pid, signal.SIGTERM)
+			except ProcessLookupError:
+				pass
+		for pid in children:
+			try:
+				os.waitpid(pid, 0)
+			except ChildProcessError:
+				pass
+
+
+def Server(workers, threads, port):
+	logging.warning("pre-fork server port {}: {} worker x {} thread".format(port, workers, threads))
+	http_metrics.enable_multiprocess()
+	supervise(workers, worker, (threads, port))
+
+
+def main():
+	log_pipeline.setup()
+	workers = os.cpu_count() or 1
+	threads = THREADS_PER_WORKER
+	port = PORT
+	if len(sys.argv) > 1:
+		workers = int(sys.argv[1])
+	if len(sys.argv) > 2:
+		threads = int(sys.argv[2])
+	if len(sys.argv) > 3:
+		port = int(sys.argv[3])
+	Server(workers, threads, port)
+
+if __name__=="__main__":
+	main()
@@ -5,6 +5,11 @@ import sys
 import logging
 import multiprocessing
 from http import HttpServer
+from http_connection import serve_connection
+import http_metrics
+import log_pipeline
+from log_pipeline import events
+from socket_tuning import prepare_listener
 
 httpserver = HttpServer()
 
@@ -16,32 +21,12 @@ class ProcessTheClient(multiprocessing.Process):
 		multiprocessing.Process.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						#logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						#logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#koneksi dibiarkan terbuka (keep-alive) sampai client menutup,
+		#idle timeout tercapai, atau batas request per koneksi habis
+		serve_connection(self.connection, httpserver)
+		#proses ini hanya hidup selama satu koneksi
+		httpserver.metrics.retire()
+		log_pipeline.shutdown()
 
 
 
@@ -49,23 +34,26 @@ class Server(multiprocessing.Process):
 	def __init__(self):
 		self.the_clients = []
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		multiprocessing.Process.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 8889))
-		self.my_socket.listen(1)
+		prepare_listener(self.my_socket, ('0.0.0.0', 8889))
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
+			events.info("connection from %s", self.client_address)
 
 			clt = ProcessTheClient(self.connection, self.client_address)
 			clt.start()
+			#salinan socket di proses induk ditutup, agar koneksi benar-benar
+			#tertutup ketika proses anak selesai melayani
+			self.connection.close()
 			self.the_clients.append(clt)
 
 
 
 def main():
+	log_pipeline.setup()
+	http_metrics.enable_multiprocess()
 	svr = Server()
 	svr.start()
 
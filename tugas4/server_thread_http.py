@@ -5,6 +5,10 @@ import time
 import sys
 import logging
 from http import HttpServer
+from http_connection import serve_connection
+from socket_tuning import prepare_listener
+import log_pipeline
+from log_pipeline import events
 
 httpserver = HttpServer()
 
@@ -16,32 +20,9 @@ class ProcessTheClient(threading.Thread):
 		threading.Thread.__init__(self)
 
 	def run(self):
-		rcv=""
-		while True:
-			try:
-				data = self.connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						self.connection.sendall(hasil)
-						rcv=""
-						self.connection.close()
-				else:
-					break
-			except OSError as e:
-				pass
-		self.connection.close()
+		#koneksi dibiarkan terbuka (keep-alive) sampai client menutup,
+		#idle timeout tercapai, atau batas request per koneksi habis
+		serve_connection(self.connection, httpserver)
 
 
 
@@ -49,15 +30,13 @@ class Server(threading.Thread):
 	def __init__(self):
 		self.the_clients = []
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 		threading.Thread.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 8889))
-		self.my_socket.listen(1)
+		prepare_listener(self.my_socket, ('0.0.0.0', 8889))
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
+			events.info("connection from %s", self.client_address)
 
 			clt = ProcessTheClient(self.connection, self.client_address)
 			clt.start()
@@ -66,6 +45,7 @@ class Server(threading.Thread):
 
 
 def main():
+	log_pipeline.setup()
 	svr = Server()
 	svr.start()
 
@@ -1,82 +1,124 @@
 from socket import *
 import socket
+import ssl
+import os
 import time
 import sys
 import logging
 import multiprocessing
 from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_connection import serve_connection
+from socket_tuning import create_listener
+import log_pipeline
+from work_queue import BoundedExecutor, reject
 
 httpserver = HttpServer()
 
+WORKERS = 20
+#koneksi yang boleh menunggu worker; selebihnya langsung ditutup
+QUEUE_MAX = 100
+
+CERT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'certs')
+HANDSHAKE_TIMEOUT = 10
+PORT = 8443
+
+
+def create_ssl_context():
+	#satu SSLContext untuk semua koneksi: sertifikat hanya dimuat sekali dan
+	#cache session / session ticket (resumption) dipakai bersama
+	context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+	context.load_cert_chain(os.path.join(CERT_DIR, 'domain.crt'), os.path.join(CERT_DIR, 'domain.key'))
+	context.minimum_version = ssl.TLSVersion.TLSv1_2
+	context.options |= ssl.OP_NO_COMPRESSION
+	context.set_alpn_protocols(['http/1.1'])
+	#TLS 1.3: jumlah session ticket yang dikirim setelah handshake penuh
+	context.num_tickets = 2
+	return context
+
+ssl_context = create_ssl_context()
+
 
 def ProcessTheClient(connection,address):
+    # handshake TLS dilakukan di thread pool, bukan di thread accept, agar
+    # handshake RSA yang mahal tidak menahan koneksi lain
     try:
-        headers_data = b""
-        while b"\r\n\r\n" not in headers_data:
-            data = connection.recv(1024)
-            if not data:
-                break
-            headers_data += data
-            
-        # -pisah headers data
-        header_part, _, body_part = headers_data.partition(b'\r\n\r\n')
-        full_request_str = header_part.decode('utf-8')
-
-        # panjang body
-        content_length = 0
-        headers_lines = full_request_str.split('\r\n')
-        for line in headers_lines:
-            if line.lower().startswith('content-length:'):
-                try:
-                    content_length = int(line.split(':')[1].strip())
-                except (ValueError, IndexError):
-                    pass
-                break
-                
-        # for body = length
-        while len(body_part) < content_length:
-            data = connection.recv(content_length - len(body_part))
-            if not data:
-                break
-            body_part += data
-            
-        full_request = full_request_str + "\r\n\r\n" + body_part.decode('utf-8', 'ignore')
-        hasil = httpserver.proses(full_request)
-        connection.sendall(hasil)
-
-    except Exception as e:
-        # logging.error(f"Error pada client {address}: {e}")
-        pass
-    finally:
+        connection.settimeout(HANDSHAKE_TIMEOUT)
+        connection = ssl_context.wrap_socket(connection, server_side=True, do_handshake_on_connect=False)
+        connection.do_handshake()
+    except (ssl.SSLError, OSError) as e:
+        logging.debug("handshake TLS dengan {} gagal: {}".format(address, e))
         connection.close()
+        return
+    # header dan body (Content-Length) dibaca per request oleh serve_connection,
+    # koneksi tetap terbuka untuk request berikutnya (keep-alive)
+    serve_connection(connection, httpserver)
     return
 
-def Server():
-	the_clients = []
-	my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-	my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+def Server(port=PORT):
+	my_socket = create_listener(('0.0.0.0', port))
 
-	my_socket.bind(('0.0.0.0', 8885))
-	my_socket.listen(1)
-
-	with ThreadPoolExecutor(20) as executor:
+	with BoundedExecutor(ThreadPoolExecutor(WORKERS), WORKERS, QUEUE_MAX) as executor:
+		httpserver.metrics.add_gauges('http_executor_', executor.stats)
 		while True:
 				connection, client_address = my_socket.accept()
 				#logging.warning("connection from {}".format(client_address))
-				p = executor.submit(ProcessTheClient, connection, client_address)
-				the_clients.append(p)
-				#menampilkan jumlah process yang sedang aktif
-				jumlah = ['x' for i in the_clients if i.running()==True]
-				print(jumlah)
+				if executor.try_submit(ProcessTheClient, connection, client_address) is None:
+					#worker dan antrian penuh: handshake belum terjadi sehingga 503
+					#tidak bisa dikirim tanpa memblokir thread accept, koneksi ditutup saja
+					reject(connection, b'')
+					logging.debug("server penuh, koneksi {} ditolak: {}".format(client_address, executor.stats()))
+
 
+def handshake(client_context, host, port, session=None):
+	#satu koneksi: handshake (diukur), satu GET, lalu session untuk resumption
+	sock = socket.create_connection((host, port))
+	tls = client_context.wrap_socket(sock, server_hostname=host, session=session, do_handshake_on_connect=False)
+	mulai = time.perf_counter()
+	tls.do_handshake()
+	durasi = time.perf_counter() - mulai
+	tls.sendall(b"GET /testing.txt HTTP/1.1\r\nConnection: close\r\n\r\n")
+	while tls.recv(65536):
+		pass
+	reused = tls.session_reused
+	session = tls.session
+	tls.close()
+	return durasi, reused, session
 
 
+def Benchmark(host='localhost', port=PORT, jumlah=200):
+	#membandingkan handshake penuh (RSA-2048) dengan handshake resumption
+	client_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+	client_context.check_hostname = False
+	client_context.verify_mode = ssl.CERT_NONE
+	client_context.set_alpn_protocols(['http/1.1'])
+
+	full = [handshake(client_context, host, port)[0] for i in range(jumlah)]
+	durasi, reused, session = handshake(client_context, host, port)
+	resumed = []
+	for i in range(jumlah):
+		durasi, reused, session = handshake(client_context, host, port, session)
+		if reused:
+			resumed.append(durasi)
+	print("handshake penuh  : {:.3f} ms rata-rata ({} koneksi)".format(1000 * sum(full) / len(full), len(full)))
+	if resumed:
+		print("handshake resumed: {:.3f} ms rata-rata ({} koneksi)".format(1000 * sum(resumed) / len(resumed), len(resumed)))
+	else:
+		print("handshake resumed: session tidak pernah dipakai ulang oleh server")
 
 
 def main():
-	Server()
+	log_pipeline.setup()
+	#python server_thread_http_secure.py [port]
+	#python server_thread_http_secure.py bench [host] [port] [jumlah]
+	if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+		host = sys.argv[2] if len(sys.argv) > 2 else 'localhost'
+		port = int(sys.argv[3]) if len(sys.argv) > 3 else PORT
+		jumlah = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+		Benchmark(host, port, jumlah)
+		return
+	port = int(sys.argv[1]) if len(sys.argv) > 1 else PORT
+	Server(port)
 
 if __name__=="__main__":
 	main()
-
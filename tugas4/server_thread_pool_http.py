@@ -6,67 +6,49 @@ import logging
 import multiprocessing
 from concurrent.futures import ThreadPoolExecutor
 from http import HttpServer
+from http_connection import serve_connection
+from socket_tuning import create_listener
+import phase_timing
+import log_pipeline
+from work_queue import BoundedExecutor, reject
 
 httpserver = HttpServer()
 
+WORKERS = 20
+#koneksi yang boleh menunggu worker; selebihnya langsung dijawab 503
+QUEUE_MAX = 100
+
 #untuk menggunakan threadpool executor, karena tidak mendukung subclassing pada process,
 #maka class ProcessTheClient dirubah dulu menjadi function, tanpda memodifikasi behaviour didalamnya
 
-def ProcessTheClient(connection,address):
-		rcv=""
-		while True:
-			try:
-				data = connection.recv(32)
-				if data:
-					#merubah input dari socket (berupa bytes) ke dalam string
-					#agar bisa mendeteksi \r\n
-					d = data.decode()
-					rcv=rcv+d
-					if rcv[-2:]=='\r\n':
-						#end of command, proses string
-						#logging.warning("data dari client: {}" . format(rcv))
-						hasil = httpserver.proses(rcv)
-						#hasil akan berupa bytes
-						#untuk bisa ditambahi dengan string, maka string harus di encode
-						hasil=hasil+"\r\n\r\n".encode()
-						#logging.warning("balas ke  client: {}" . format(hasil))
-						#hasil sudah dalam bentuk bytes
-						connection.sendall(hasil)
-						rcv=""
-						connection.close()
-						return
-				else:
-					break
-			except OSError as e:
-				pass
-		connection.close()
+def ProcessTheClient(connection,address,trace=None):
+		#koneksi dibiarkan terbuka (keep-alive) sampai client menutup,
+		#idle timeout tercapai, atau batas request per koneksi habis
+		serve_connection(connection, httpserver, trace)
 		return
 
 
 
 def Server():
-	the_clients = []
-	my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-	my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-
-	my_socket.bind(('0.0.0.0', 8885))
-	my_socket.listen(1)
+	my_socket = create_listener(('0.0.0.0', 8885))
 
-	with ThreadPoolExecutor(20) as executor:
+	with BoundedExecutor(ThreadPoolExecutor(WORKERS), WORKERS, QUEUE_MAX) as executor:
+		httpserver.metrics.add_gauges('http_executor_', executor.stats)
 		while True:
 				connection, client_address = my_socket.accept()
 				#logging.warning("connection from {}".format(client_address))
-				p = executor.submit(ProcessTheClient, connection, client_address)
-				the_clients.append(p)
-				#menampilkan jumlah process yang sedang aktif
-				jumlah = ['x' for i in the_clients if i.running()==True]
-				print(jumlah)
+				trace = phase_timing.begin('http')
+				if executor.try_submit(ProcessTheClient, connection, client_address, trace) is None:
+					#worker dan antrian penuh: tolak sekarang daripada menumpuk tanpa batas
+					reject(connection, httpserver.busy())
+					logging.debug("server penuh, koneksi {} ditolak: {}".format(client_address, executor.stats()))
 
 
 
 
 
 def main():
+	log_pipeline.setup()
 	Server()
 
 if __name__=="__main__":
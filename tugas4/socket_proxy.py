@@ -4,12 +4,16 @@ import threading
 import time
 import sys
 import logging
+from socket_tuning import prepare_listener, tune_connection
+import log_pipeline
+from log_pipeline import events, log_access
 
 
 
 class ProcessTheClient(threading.Thread):
 	def __init__(self, connection, address, destination_sock_address):
 		self.destination_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		tune_connection(self.destination_sock)
 		self.destination_sock.connect(destination_sock_address)
 		self.connection = connection
 		self.address = address
@@ -17,6 +21,9 @@ class ProcessTheClient(threading.Thread):
 
 	def run(self):
 		rcv=""
+		#isi data tidak lagi dicatat per potongan; satu baris access log per koneksi
+		started = time.perf_counter()
+		dikirim = 0
 		while True:
 			try:
 				data = self.connection.recv(8192)
@@ -24,14 +31,14 @@ class ProcessTheClient(threading.Thread):
 					self.destination_sock.sendall(data)
 					data_balasan = self.destination_sock.recv(8192)
 					self.connection.sendall(data_balasan)
-					logging.warning(data)
-					logging.warning(data_balasan)
+					dikirim += len(data_balasan)
 
 				else:
 					break
 			except OSError as e:
 				pass
 		self.connection.close()
+		log_access('proxy', 'TCP', '{}:{}'.format(*self.address), 'closed', dikirim, time.perf_counter() - started)
 
 
 
@@ -39,17 +46,15 @@ class Server(threading.Thread):
 	def __init__(self):
 		self.the_clients = []
 		self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-		self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
 		self.destination_sock_address = ('localhost',8889)
 		threading.Thread.__init__(self)
 
 	def run(self):
-		self.my_socket.bind(('0.0.0.0', 18000))
-		self.my_socket.listen(1)
+		prepare_listener(self.my_socket, ('0.0.0.0', 18000))
 		while True:
 			self.connection, self.client_address = self.my_socket.accept()
-			logging.warning("connection from {}".format(self.client_address))
+			events.info("connection from %s", self.client_address)
 
 			clt = ProcessTheClient(self.connection, self.client_address,self.destination_sock_address)
 			clt.start()
@@ -58,6 +63,7 @@ class Server(threading.Thread):
 
 
 def main():
+	log_pipeline.setup()
 	svr = Server()
 	svr.start()
 
@@ -0,0 +1,132 @@
+import os
+import socket
+import logging
+
+#pengaturan socket listener yang dipakai bersama oleh semua server (HTTP,
+#file server, time server, proxy). Profil dipilih per deployment lewat
+#environment, misalnya:
+#
+#   SOCKET_PROFILE=latency python server_thread_pool_http.py
+#   SOCKET_PROFILE=bulk SOCKET_BACKLOG=2048 python file_server_threading_pool.py
+#
+#setiap opsi profil bisa ditimpa dengan SOCKET_<NAMA_OPSI> (huruf besar).
+#Nilai 0 berarti opsi tidak disentuh (default kernel).
+
+PROFILES = {
+    'default': {
+        'backlog': 128,
+        'nodelay': 1,
+        'defer_accept': 0,
+        'fastopen': 0,
+        'sndbuf': 0,
+        'rcvbuf': 0,
+        'accept_batch': 16,
+    },
+    # banyak request kecil dari banyak client (ab -c, stress test)
+    'latency': {
+        'backlog': 1024,
+        'nodelay': 1,
+        'defer_accept': 1,
+        'fastopen': 256,
+        'sndbuf': 0,
+        'rcvbuf': 0,
+        'accept_batch': 64,
+    },
+    # transfer file besar: buffer kernel besar, Nagle dibiarkan aktif
+    'bulk': {
+        'backlog': 256,
+        'nodelay': 0,
+        'defer_accept': 0,
+        'fastopen': 0,
+        'sndbuf': 4 * 1024 * 1024,
+        'rcvbuf': 4 * 1024 * 1024,
+        'accept_batch': 16,
+    },
+}
+
+
+def get_profile(profile=None):
+    """
+    Mengembalikan dict opsi. profile boleh None (pakai SOCKET_PROFILE atau
+    'default'), nama profil, atau dict yang sudah jadi.
+    """
+    if isinstance(profile, dict):
+        return profile
+    name = profile or os.environ.get('SOCKET_PROFILE', 'default')
+    if name not in PROFILES:
+        raise ValueError("profil socket tidak dikenal: {}".format(name))
+    options = dict(PROFILES[name])
+    for key in options:
+        value = os.environ.get('SOCKET_' + key.upper())
+        if value is not None:
+            options[key] = int(value)
+    return options
+
+
+def _setsockopt(sock, level, name, value):
+    # opsi yang tidak didukung platform/kernel dilewati, bukan fatal
+    option = getattr(socket, name, None)
+    if option is None:
+        return False
+    try:
+        sock.setsockopt(level, option, value)
+        return True
+    except OSError as e:
+        logging.debug("{} tidak bisa dipasang: {}".format(name, e))
+        return False
+
+
+def tune_connection(sock, profile=None):
+    """Opsi per koneksi, untuk socket yang tidak berasal dari listener ini (mis. koneksi keluar proxy)."""
+    options = get_profile(profile)
+    if options['nodelay']:
+        _setsockopt(sock, socket.IPPROTO_TCP, 'TCP_NODELAY', 1)
+    if options['sndbuf']:
+        _setsockopt(sock, socket.SOL_SOCKET, 'SO_SNDBUF', options['sndbuf'])
+    if options['rcvbuf']:
+        _setsockopt(sock, socket.SOL_SOCKET, 'SO_RCVBUF', options['rcvbuf'])
+    return sock
+
+
+def prepare_listener(sock, address, profile=None, reuseport=False):
+    """Memasang opsi, bind, lalu listen pada socket yang sudah dibuat."""
+    options = get_profile(profile)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuseport:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # TCP_NODELAY dan ukuran buffer diwarisi socket hasil accept(), jadi
+    # cukup dipasang sekali di sini; buffer harus diset sebelum listen agar
+    # window scaling yang diumumkan saat handshake ikut menyesuaikan
+    tune_connection(sock, options)
+    if options['defer_accept']:
+        # accept() baru bangun setelah client benar-benar mengirim data
+        _setsockopt(sock, socket.IPPROTO_TCP, 'TCP_DEFER_ACCEPT', options['defer_accept'])
+    sock.bind(address)
+    if options['fastopen']:
+        _setsockopt(sock, socket.IPPROTO_TCP, 'TCP_FASTOPEN', options['fastopen'])
+    sock.listen(options['backlog'])
+    return sock
+
+
+def create_listener(address, profile=None, reuseport=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        return prepare_listener(sock, address, profile, reuseport)
+    except Exception:
+        sock.close()
+        raise
+
+
+def accept_batch(listener, profile=None):
+    """
+    Untuk listener non-blocking: mengambil sebanyak-banyaknya accept_batch
+    koneksi per wakeup, mengembalikan list (sock, address).
+    """
+    limit = get_profile(profile)['accept_batch']
+    accepted = []
+    while len(accepted) < limit:
+        try:
+            accepted.append(listener.accept())
+        except (BlockingIOError, InterruptedError):
+            break
+    return accepted
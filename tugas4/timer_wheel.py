@@ -0,0 +1,238 @@
+import os
+import math
+import time
+import socket
+import logging
+import threading
+
+#hashed timer wheel untuk deadline per koneksi (header, body, idle).
+#Menjadwalkan, membatalkan dan menjadwalkan ulang timer semuanya O(1), dan
+#setiap tick hanya memeriksa satu slot, sehingga ribuan koneksi bisa diawasi
+#tanpa menyapu seluruh daftar koneksi. Resolusi deadline = TICK detik.
+
+TICK = 0.25
+SLOTS = 256
+
+#batas waktu per fase koneksi, bisa diubah lewat environment
+#(mis. HEADER_TIMEOUT=5 MIN_RATE=4096 python3 server_thread_pool_http.py)
+HEADER_TIMEOUT = float(os.environ.get('HEADER_TIMEOUT', '10'))
+#body/upload: minimal MIN_RATE byte/detik, diperiksa setiap RATE_WINDOW detik
+MIN_RATE = int(os.environ.get('MIN_RATE', '1024'))
+RATE_WINDOW = float(os.environ.get('RATE_WINDOW', '5'))
+
+#jumlah koneksi yang ditutup karena deadline, per fase (dibaca oleh /stats dsb.)
+expired_counts = {}
+_counts_lock = threading.Lock()
+
+
+def count_expired(phase):
+    with _counts_lock:
+        expired_counts[phase] = expired_counts.get(phase, 0) + 1
+
+
+class Timer:
+    __slots__ = ('callback', 'slot', 'rounds')
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.slot = None
+        self.rounds = 0
+
+
+class TimerWheel:
+    def __init__(self, tick=TICK, slots=SLOTS):
+        self.tick = tick
+        self.wheel = [set() for i in range(slots)]
+        self.current = 0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def schedule(self, delay, callback, timer=None):
+        """Menjadwalkan (atau menjadwalkan ulang timer yang sudah ada) delay detik dari sekarang."""
+        if timer is None:
+            timer = Timer(callback)
+        ticks = max(1, math.ceil(delay / self.tick))
+        # slot dikunjungi pertama kali setelah ((ticks - 1) % n) + 1 tick, lalu
+        # setiap n tick; kelipatan tepat n tidak boleh menunggu satu putaran lagi
+        rounds = (ticks - 1) // len(self.wheel)
+        with self.lock:
+            # callback diganti di bawah lock, bersamaan dengan pengambilan
+            # callback timer yang jatuh tempo di advance()
+            timer.callback = callback
+            if timer.slot is not None:
+                self.wheel[timer.slot].discard(timer)
+            timer.rounds = rounds
+            timer.slot = (self.current + ticks) % len(self.wheel)
+            self.wheel[timer.slot].add(timer)
+        return timer
+
+    def cancel(self, timer):
+        with self.lock:
+            if timer.slot is not None:
+                self.wheel[timer.slot].discard(timer)
+                timer.slot = None
+
+    def advance(self, now=None):
+        """
+        Memajukan wheel sampai waktu now dan menjalankan callback timer yang
+        jatuh tempo (di luar lock, sehingga callback boleh menjadwalkan ulang).
+        """
+        if now is None:
+            now = time.monotonic()
+        expired = []
+        with self.lock:
+            while now - self.last >= self.tick:
+                self.last += self.tick
+                self.current = (self.current + 1) % len(self.wheel)
+                bucket = self.wheel[self.current]
+                for timer in list(bucket):
+                    if timer.rounds > 0:
+                        timer.rounds -= 1
+                    else:
+                        bucket.discard(timer)
+                        timer.slot = None
+                        # callback diambil sekarang: jika timer dijadwalkan
+                        # ulang sebelum callback berjalan, yang terpanggil tetap
+                        # callback lama (dengan generasi lama), bukan yang baru
+                        expired.append(timer.callback)
+        for callback in expired:
+            try:
+                callback()
+            except Exception as e:
+                logging.error("timer gagal: {}".format(e))
+        return len(expired)
+
+
+class Reaper(threading.Thread):
+    #thread latar yang memajukan wheel bersama untuk server blocking
+    def __init__(self, wheel):
+        threading.Thread.__init__(self, daemon=True)
+        self.wheel = wheel
+
+    def run(self):
+        while True:
+            time.sleep(self.wheel.tick)
+            self.wheel.advance()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_wheel():
+    """Wheel per proses; dibuat ulang setelah fork (pre-fork, process pool)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared[0] != os.getpid():
+            wheel = TimerWheel()
+            Reaper(wheel).start()
+            _shared = (os.getpid(), wheel)
+        return _shared[1]
+
+
+class Deadline:
+    """
+    Satu timer per koneksi yang berpindah fase (idle, head, body). Saat
+    jatuh tempo koneksi di-shutdown sehingga recv() di thread pelayan
+    langsung kembali, atau on_expire dipanggil jika diberikan.
+    """
+
+    def __init__(self, sock, wheel=None, on_expire=None):
+        self.sock = sock
+        self.wheel = wheel or shared_wheel()
+        self.on_expire = on_expire
+        self.timer = None
+        self.phase = None
+        self.expired = None
+        self.received = 0
+        self.mark = 0
+        # timer yang sudah diambil reaper bisa saja jatuh tempo tepat setelah
+        # dibatalkan; generasi mencegah callback basi menutup koneksi
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def arm(self, phase, timeout):
+        with self.lock:
+            self.generation += 1
+            self.phase = phase
+            generation = self.generation
+            self.timer = self.wheel.schedule(timeout, lambda: self._expire(generation), self.timer)
+
+    def arm_rate(self, phase='body', min_rate=MIN_RATE, window=RATE_WINDOW):
+        # fase transfer: koneksi boleh hidup lama selama datanya terus mengalir
+        with self.lock:
+            self.generation += 1
+            self.phase = phase
+            self.mark = self.received
+            generation = self.generation
+            self.timer = self.wheel.schedule(window, lambda: self._check_rate(generation, min_rate, window), self.timer)
+
+    def progress(self, n):
+        self.received += n
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.phase = None
+            if self.timer is not None:
+                self.wheel.cancel(self.timer)
+
+    def _check_rate(self, generation, min_rate, window):
+        with self.lock:
+            if generation != self.generation:
+                return
+            if self.received - self.mark >= min_rate * window:
+                self.mark = self.received
+                self.wheel.schedule(window, lambda: self._check_rate(generation, min_rate, window), self.timer)
+                return
+        self._expire(generation)
+
+    def _expire(self, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.expired = self.phase
+            count_expired(self.phase)
+            logging.debug("deadline {} habis, koneksi ditutup".format(self.phase))
+            if self.on_expire is None:
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        if self.on_expire is not None:
+            self.on_expire()
+
+
+def recv_request(connection, address, timeout, bufsize=8192):
+    """
+    Membaca satu pesan dari client yang tidak membingkai pesannya (server
+    file): pesan dianggap lengkap jika client diam satu detik setelah byte
+    pertama. Pesan harus mulai dalam timeout detik lalu terus mengalir
+    minimal MIN_RATE byte/detik; jika tidak, reaper men-shutdown socket dan
+    hasilnya b"".
+    """
+    data = b""
+    connection.settimeout(timeout)
+    deadline = Deadline(connection)
+    deadline.arm('head', timeout)
+    while True:
+        try:
+            chunk = connection.recv(bufsize)
+            if not chunk:
+                break
+            if not data:
+                deadline.arm_rate('body')
+            deadline.progress(len(chunk))
+            data += chunk
+            connection.settimeout(1.0)
+        except socket.timeout:
+            if data or deadline.expired:
+                break
+        except Exception as e:
+            logging.error("gagal menerima data dari {}: {}".format(address, e))
+            break
+    deadline.cancel()
+    if deadline.expired:
+        logging.warning("client lambat {} ditutup (deadline {})".format(address, deadline.expired))
+        return b""
+    return data
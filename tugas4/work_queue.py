@@ -0,0 +1,83 @@
+import socket
+import threading
+
+#antrian kerja terbatas di depan ThreadPoolExecutor/ProcessPoolExecutor.
+#Koneksi yang melebihi kapasitas (worker + antrian) langsung ditolak oleh
+#thread accept, sehingga memori tidak tumbuh tanpa batas saat server kelebihan
+#beban. Gauge in-flight/queued/completed diperbarui O(1) lewat done callback,
+#tanpa menyimpan daftar future.
+
+RETRY_AFTER = 1
+
+
+class BoundedExecutor:
+    def __init__(self, executor, max_workers, max_queue=100):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self.lock = threading.Lock()
+        self.outstanding = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def try_submit(self, fn, *args):
+        """Mengembalikan future, atau None jika antrian penuh."""
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return None
+        with self.lock:
+            self.outstanding += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.outstanding -= 1
+            self.completed += 1
+        self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            # executor FIFO: yang berjalan paling banyak max_workers, sisanya antre
+            in_flight = min(self.outstanding, self.max_workers)
+            return {
+                'in_flight': in_flight,
+                'queued': self.outstanding - in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown(wait=True)
+        return False
+
+
+def reject(connection, payload):
+    """Mengirim jawaban 'sedang sibuk' langsung dari thread accept lalu menutup koneksi."""
+    try:
+        connection.setblocking(False)
+        try:
+            # buang request yang sudah masuk agar close() tidak mengirim RST
+            connection.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            pass
+        connection.settimeout(1.0)
+        connection.sendall(payload)
+        connection.shutdown(socket.SHUT_WR)
+    except OSError:
+        pass
+    finally:
+        connection.close()